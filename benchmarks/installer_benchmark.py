@@ -0,0 +1,78 @@
+"""
+Compares how long each installer backend takes to install the same requirements.
+
+Every run installs into a fresh target directory. The first run of each backend also
+warms that backend's own download cache, so it is reported separately from the rest.
+
+    python benchmarks/installer_benchmark.py --requirements path/to/requirements.txt
+"""
+import argparse
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from lambda_packager.handle_requirements_txt import (  # noqa: E402
+    INSTALLERS,
+    UV,
+    install_requirements_txt,
+)
+
+DEFAULT_REQUIREMENTS = """requests==2.31.0
+PyYAML==6.0.1
+"""
+
+
+def time_install(installer, requirements: Path, platform):
+    with tempfile.TemporaryDirectory() as target:
+        start = time.perf_counter()
+        install_requirements_txt(
+            target,
+            requirements_file_path=requirements,
+            installer=installer,
+            platform=platform,
+        )
+        return time.perf_counter() - start
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        requirements = Path(tmp, "requirements.txt")
+        if args.requirements:
+            shutil.copyfile(args.requirements, requirements)
+        else:
+            requirements.write_text(DEFAULT_REQUIREMENTS)
+
+        print(f"{'installer':<10} {'first run':>10} {'median':>10} {'min':>10}")
+        for installer in args.installers:
+            if installer == UV and shutil.which("uv") is None:
+                print(f"{installer:<10} skipped as it is not installed")
+                continue
+
+            first = time_install(installer, requirements, args.platform)
+            runs = [
+                time_install(installer, requirements, args.platform)
+                for _ in range(args.repeat)
+            ]
+            print(
+                f"{installer:<10} {first:>9.2f}s {statistics.median(runs):>9.2f}s {min(runs):>9.2f}s"
+            )
+
+
+def parse_args(args):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requirements", help="defaults to a small set of packages")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--platform", default=None)
+    parser.add_argument(
+        "--installers", nargs="+", choices=INSTALLERS, default=INSTALLERS
+    )
+    return parser.parse_args(args)
+
+
+if __name__ == "__main__":
+    main(parse_args(sys.argv[1:]))
@@ -0,0 +1,119 @@
+"""
+Measures wall time and peak RSS of writing a lambda zip.
+
+Each run happens in a fresh child process so that the reported peak RSS belongs to
+that run alone. The idle row is the interpreter and imports on their own, and the
+make_archive row is the shutil.make_archive call earlier versions zipped with.
+
+    python benchmarks/zip_benchmark.py --size-mb 512
+    python benchmarks/zip_benchmark.py --small-files 50000
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from lambda_packager.archive import CompressionPolicy, create_zip  # noqa: E402
+
+
+def build_tree(root: Path, size_mb, file_mb):
+    """Half compressible text, half random bytes, similar to a package with native libs"""
+    block = b"import this\n" * (1024 * 1024 // 12)
+    for index in range(max(1, size_mb // file_mb)):
+        path = root.joinpath(f"pkg_{index % 16}", f"file_{index}.bin")
+        path.parent.mkdir(exist_ok=True)
+        with open(path, "wb") as f:
+            for megabyte in range(file_mb):
+                f.write(os.urandom(len(block)) if megabyte % 2 else block)
+
+
+def build_small_files(root: Path, count):
+    """Many small modules, where the zip's per entry bookkeeping dominates"""
+    for index in range(count):
+        path = root.joinpath(f"pkg_{index % 500}", f"module_{index}.py")
+        path.parent.mkdir(exist_ok=True)
+        path.write_text("value = 1\n" * 20)
+
+
+def peak_rss_bytes():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # linux reports kilobytes, macOS reports bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def child(args):
+    start = time.perf_counter()
+    if args.source and args.make_archive:
+        shutil.make_archive(args.target[: -len(".zip")], "zip", root_dir=args.source)
+    elif args.source:
+        create_zip(
+            args.source,
+            args.target,
+            compression_policy=CompressionPolicy(level=args.level),
+        )
+    print(
+        json.dumps(
+            {"seconds": time.perf_counter() - start, "peak_rss": peak_rss_bytes()}
+        )
+    )
+
+
+def run_child(*extra):
+    cmd = [sys.executable, __file__, "--child", *extra]
+    return json.loads(subprocess.check_output(cmd).decode())
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp, "src")
+        source.mkdir()
+        if args.small_files:
+            build_small_files(source, args.small_files)
+            print(f"package:        {args.small_files} small files")
+        else:
+            build_tree(source, args.size_mb, args.file_mb)
+            print(f"package:        {args.size_mb} MiB in {args.file_mb} MiB files")
+        target = Path(tmp, "lambda.zip")
+        common = ["--source", str(source), "--target", str(target)]
+
+        idle = run_child()
+        print(f"idle peak rss:  {idle['peak_rss'] / 1024 / 1024:.1f} MiB")
+        for name, extra in [
+            ("make_archive", ["--make-archive"]),
+            ("create_zip", ["--level", str(args.level)]),
+        ]:
+            result = run_child(*common, *extra)
+            print(
+                f"{name + ':':<15} {result['seconds']:.2f}s, "
+                f"peak rss {result['peak_rss'] / 1024 / 1024:.1f} MiB, "
+                f"{target.stat().st_size} bytes zipped"
+            )
+
+
+def parse_args(args):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size-mb", type=int, default=256)
+    parser.add_argument("--file-mb", type=int, default=8)
+    parser.add_argument("--small-files", type=int, default=0)
+    parser.add_argument("--level", type=int, default=6)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--source", help=argparse.SUPPRESS)
+    parser.add_argument("--target", help=argparse.SUPPRESS)
+    parser.add_argument("--make-archive", action="store_true", help=argparse.SUPPRESS)
+    return parser.parse_args(args)
+
+
+if __name__ == "__main__":
+    parsed = parse_args(sys.argv[1:])
+    if parsed.child:
+        child(parsed)
+    else:
+        main(parsed)
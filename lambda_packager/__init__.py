@@ -4,7 +4,24 @@ import sys
 from pathlib import Path
 
 from lambda_packager.custom_log_formatter import CustomLogFormatter
-from lambda_packager.package import LambdaAutoPackage
+from lambda_packager.daemon_client import run_remote
+from lambda_packager.handle_requirements_txt import INSTALLERS
+from lambda_packager.reporting import (
+    JSON,
+    LOG_FORMATS,
+    TEXT,
+    JsonLogFormatter,
+    Reporter,
+)
+
+
+def __getattr__(name):
+    # LambdaAutoPackage is loaded lazily, so builds forwarded to the daemon never import the packaging code
+    if name == "LambdaAutoPackage":
+        from lambda_packager.package import LambdaAutoPackage
+
+        return LambdaAutoPackage
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def parse_args(args):
@@ -35,6 +52,30 @@ def parse_args(args):
             logging.getLevelName(logging.ERROR),
         ],
     )
+    parser.add_argument(
+        "--log-format",
+        dest="log_format",
+        required=False,
+        default=TEXT,
+        help=f"'{JSON}' writes one json object per log line for CI, defaults to '{TEXT}'",
+        choices=LOG_FORMATS,
+    )
+    parser.add_argument(
+        "--installer",
+        dest="installer",
+        required=False,
+        default=None,
+        help="the backend used to install dependencies, overrides 'installer' in pyproject.toml",
+        choices=INSTALLERS,
+    )
+    parser.add_argument(
+        "--daemon-socket",
+        dest="daemon_socket",
+        required=False,
+        default=None,
+        help="""Forward the build to a lambda-packager-daemon listening on this unix socket.
+                Builds locally if the daemon cannot be reached""",
+    )
     return parser.parse_args(args)
 
 
@@ -52,12 +93,47 @@ def run_cli():
     logger.setLevel(log_level)
 
     ch = logging.StreamHandler()
-    ch.setFormatter(CustomLogFormatter())
+    if args.log_format == JSON:
+        ch.setFormatter(JsonLogFormatter())
+    else:
+        ch.setFormatter(CustomLogFormatter())
     ch.setLevel(log_level)
     logger.addHandler(ch)
 
+    reporter = Reporter.for_stream(logger, ch.stream, args.log_format)
+    if reporter.progress_bar:
+        ch.addFilter(reporter.progress_bar)
+
+    if args.daemon_socket:
+        options = {
+            "project_directory": str(project_directory.resolve()),
+            "log_level": args.log_level,
+            "installer": args.installer,
+        }
+        try:
+            run_remote(args.daemon_socket, options, logger)
+            return
+        except (FileNotFoundError, ConnectionRefusedError):
+            logger.warning(
+                f"could not connect to the daemon at '{args.daemon_socket}', building locally"
+            )
+        except Exception as e:
+            logger.critical(e)
+            raise e
+
+    from lambda_packager.package import LambdaAutoPackage
+
+    package = None
     try:
-        LambdaAutoPackage(logger=logger, project_directory=project_directory).execute()
+        package = LambdaAutoPackage(
+            logger=logger, project_directory=project_directory, reporter=reporter
+        )
+        if args.installer:
+            package.config.installer = args.installer
+        package.execute()
     except Exception as e:
         logger.critical(e)
         raise e
+    finally:
+        if package:
+            package.cleanup()
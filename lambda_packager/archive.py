@@ -0,0 +1,162 @@
+import fnmatch
+import logging
+import os
+import zipfile
+import zlib
+from pathlib import Path
+
+STORE = "store"
+DEFLATE = "deflate"
+
+# formats that are already compressed and would only waste cpu being deflated again
+DEFAULT_STORE_PATTERNS = [
+    "*.whl",
+    "*.zip",
+    "*.jar",
+    "*.gz",
+    "*.tgz",
+    "*.bz2",
+    "*.xz",
+    "*.zst",
+    "*.7z",
+    "*.png",
+    "*.jpg",
+    "*.jpeg",
+    "*.gif",
+    "*.webp",
+]
+
+
+class UnsupportedCompression(Exception):
+    pass
+
+
+class CompressionPolicy:
+    def __init__(
+        self,
+        level=6,
+        overrides=None,
+        store_threshold=0.9,
+        trial_size=64 * 1024,
+    ):
+        if overrides is None:
+            overrides = {}
+
+        self.level = CompressionPolicy._check_level(level)
+        self.store_threshold = store_threshold
+        self.trial_size = trial_size
+        self.overrides = {pattern: STORE for pattern in DEFAULT_STORE_PATTERNS}
+        for pattern, value in overrides.items():
+            self.overrides[pattern] = CompressionPolicy._parse_override(value)
+
+    def compression_for(self, path: Path, arcname: str):
+        """Return the (compress_type, compresslevel) to use for a single file"""
+        setting = self._matching_override(arcname)
+
+        if setting is None and self._barely_compresses(path):
+            logging.debug("storing %s as a trial compression saved little", arcname)
+            setting = STORE
+
+        if setting == STORE or setting == 0:
+            return zipfile.ZIP_STORED, None
+        if setting is None or setting == DEFLATE:
+            return zipfile.ZIP_DEFLATED, self.level
+        return zipfile.ZIP_DEFLATED, setting
+
+    def _matching_override(self, arcname):
+        # later entries win so that user overrides beat the defaults
+        setting = None
+        for pattern, value in self.overrides.items():
+            if fnmatch.fnmatch(arcname, pattern):
+                setting = value
+        return setting
+
+    def _barely_compresses(self, path: Path):
+        if self.store_threshold >= 1:
+            return False
+
+        with open(path, "rb") as f:
+            sample = f.read(self.trial_size)
+        if not sample:
+            return False
+
+        compressed = zlib.compress(sample, 1)
+        return len(compressed) / len(sample) > self.store_threshold
+
+    @staticmethod
+    def _check_level(level):
+        if not isinstance(level, int) or isinstance(level, bool) or not 0 <= level <= 9:
+            raise ValueError(
+                f"compression level '{level}' is not valid. should be between 0 and 9"
+            )
+        return level
+
+    @staticmethod
+    def _parse_override(value):
+        if value in (STORE, DEFLATE):
+            return value
+        if value in ("bzip2", "lzma"):
+            raise UnsupportedCompression(
+                f"'{value}' compression cannot be read by AWS Lambda. use '{STORE}', '{DEFLATE}' or a level 0-9"
+            )
+        if isinstance(value, str) and value.isdigit():
+            value = int(value)
+        return CompressionPolicy._check_level(value)
+
+
+def create_zip(
+    source_dir,
+    target,
+    compression_policy=None,
+    files=None,
+    prefix="",
+    progress=None,
+):
+    """
+    Zip source_dir into target.
+
+    When files (paths relative to source_dir) are given only those are included,
+    and every entry can be placed under prefix, e.g. 'python/' for a lambda layer.
+    progress, a reporting Stage, counts the files and bytes written.
+    """
+    if compression_policy is None:
+        compression_policy = CompressionPolicy()
+
+    source_dir = Path(source_dir)
+    target = Path(target).resolve()
+    if files is None:
+        entries = walk_entries(source_dir)
+    else:
+        entries = (
+            (source_dir.joinpath(file), Path(file).as_posix(), False)
+            for file in sorted(files)
+        )
+
+    with zipfile.ZipFile(target, "w") as zf:
+        for path, relative, is_dir in entries:
+            arcname = prefix + relative
+            if is_dir:
+                zf.write(path, arcname)
+                continue
+            if path.resolve() == target:
+                continue
+
+            compress_type, level = compression_policy.compression_for(path, arcname)
+            # ZipFile.write streams the file in 8KiB blocks, so memory does not grow with file sizes
+            zf.write(path, arcname, compress_type=compress_type, compresslevel=level)
+            if progress:
+                progress.add("files")
+                progress.add("bytes", zf.getinfo(arcname).file_size)
+
+
+def walk_entries(source_dir: Path):
+    """Yield (path, relative posix path, is_dir) for everything under source_dir in a stable order"""
+    for root, dirs, files in os.walk(source_dir):
+        dirs.sort()
+        root = Path(root)
+        if root != source_dir:
+            yield root, root.relative_to(source_dir).as_posix(), True
+
+        for file in sorted(files):
+            path = root.joinpath(file)
+            yield path, path.relative_to(source_dir).as_posix(), False
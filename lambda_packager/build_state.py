@@ -0,0 +1,108 @@
+import logging
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+
+from lambda_packager.handle_wheel_store import link_tree
+
+# each installed dependency tree is hard linked, but its inodes stay on disk until evicted
+DEFAULT_MAX_DEPENDENCIES = 8
+
+
+def _signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return str(path), None
+    return str(path), stat.st_mtime_ns, stat.st_size
+
+
+def directories(source_dir: Path, ignored=None):
+    """
+    Every directory under source_dir, whose mtimes change whenever an entry is added, removed or renamed.
+
+    Directories for which ignored(path) is true are not listed or descended into.
+    """
+    found = []
+    for root, dirs, _files in os.walk(source_dir):
+        if ignored:
+            dirs[:] = [name for name in dirs if not ignored(Path(root, name))]
+        dirs.sort()
+        found.append(root)
+    return found
+
+
+class BuildState:
+    """
+    Parsed files, file walks and installed dependencies kept warm between builds.
+
+    Each cached value remembers the mtime and size of the files it was computed from,
+    and is recomputed as soon as any of them changes.
+    """
+
+    def __init__(self, directory: Path, max_dependencies=DEFAULT_MAX_DEPENDENCIES):
+        self.directory = Path(directory)
+        self.max_dependencies = max_dependencies
+        self._entries = {}
+        self._walks = {}
+        self._dependencies = OrderedDict()
+
+    def cached(self, key, files, compute):
+        signature = tuple(_signature(file) for file in files)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == signature:
+            logging.debug("using cached %s", key[0])
+            return entry[1]
+
+        value = compute()
+        self._entries[key] = (signature, value)
+        return value
+
+    def cached_walk(self, key, list_directories, compute):
+        """
+        Like cached, for a value computed by walking directories.
+
+        The directory list is kept with the value, so while none of those directories
+        change a lookup only stats them instead of walking the tree again.
+        """
+        entry = self._walks.get(key)
+        if entry is not None:
+            walked, signature, value = entry
+            if tuple(_signature(directory) for directory in walked) == signature:
+                logging.debug("using cached %s", key[0])
+                return value
+
+        walked = list_directories()
+        signature = tuple(_signature(directory) for directory in walked)
+        value = compute()
+        self._walks[key] = (walked, signature, value)
+        return value
+
+    def restore_dependencies(self, key, target: Path):
+        installed = self._dependencies.get(key)
+        if installed is None or not installed.is_dir():
+            return False
+        logging.info("using dependencies installed by a previous build")
+        self._dependencies.move_to_end(key)
+        link_tree(installed, Path(target))
+        return True
+
+    def save_dependencies(self, key, source: Path, parent=None):
+        """Keep a linked copy of an installed tree, under parent when given, such as the build's staging directory"""
+        if key in self._dependencies:
+            return
+        installed = Path(tempfile.mkdtemp(dir=parent or self.directory))
+        link_tree(Path(source), installed)
+        self._dependencies[key] = installed
+
+        while len(self._dependencies) > self.max_dependencies:
+            _key, evicted = self._dependencies.popitem(last=False)
+            logging.debug("evicting dependencies installed at %s", evicted)
+            shutil.rmtree(evicted, ignore_errors=True)
+
+    def clear(self):
+        while self._dependencies:
+            _key, installed = self._dependencies.popitem()
+            shutil.rmtree(installed, ignore_errors=True)
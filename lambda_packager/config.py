@@ -1,3 +1,8 @@
+from lambda_packager.handle_requirements_txt import PIP
+from lambda_packager.layers import DEFAULT_LAYER_SIZE_LIMIT
+from lambda_packager.remote_cache import DEFAULT_WORKERS
+
+
 class Config:
     def __init__(
         self,
@@ -5,10 +10,37 @@ class Config:
         ignore_hidden_files=True,
         ignore_folders=None,
         without_hashes=False,
+        wheel_store=None,
+        compression_level=6,
+        compression_overrides=None,
+        store_threshold=0.9,
+        staging_directory=None,
+        max_layers=0,
+        layer_size_limit=DEFAULT_LAYER_SIZE_LIMIT,
+        output_format="zip",
+        image_cmd=None,
+        image_base=None,
+        image_architecture="amd64",
+        verify_imports=False,
+        verify_workers=None,
+        verify_timeout=30,
+        verify_python=None,
+        verify_ignore=None,
+        remote_cache=None,
+        remote_cache_endpoint_url=None,
+        remote_cache_workers=DEFAULT_WORKERS,
+        installer=PIP,
+        platform=None,
     ):
         if ignore_folders is None:
             ignore_folders = []
 
+        if compression_overrides is None:
+            compression_overrides = {}
+
+        if verify_ignore is None:
+            verify_ignore = []
+
         if src_patterns is None:
             src_patterns = ["*.py"]
 
@@ -16,3 +48,24 @@ class Config:
         self.src_patterns = src_patterns
         self.ignore_hidden_files = ignore_hidden_files
         self.without_hashes = without_hashes
+        self.wheel_store = wheel_store
+        self.compression_level = compression_level
+        self.compression_overrides = compression_overrides
+        self.store_threshold = store_threshold
+        self.staging_directory = staging_directory
+        self.max_layers = max_layers
+        self.layer_size_limit = layer_size_limit
+        self.output_format = output_format
+        self.image_cmd = image_cmd
+        self.image_base = image_base
+        self.image_architecture = image_architecture
+        self.verify_imports = verify_imports
+        self.verify_workers = verify_workers
+        self.verify_timeout = verify_timeout
+        self.verify_python = verify_python
+        self.verify_ignore = verify_ignore
+        self.remote_cache = remote_cache
+        self.remote_cache_endpoint_url = remote_cache_endpoint_url
+        self.remote_cache_workers = remote_cache_workers
+        self.installer = installer
+        self.platform = platform
@@ -0,0 +1,150 @@
+import argparse
+import json
+import logging
+import shutil
+import socketserver
+import sys
+import tempfile
+from pathlib import Path
+
+from lambda_packager.build_state import DEFAULT_MAX_DEPENDENCIES, BuildState
+from lambda_packager.custom_log_formatter import CustomLogFormatter
+from lambda_packager.daemon_client import send_message
+from lambda_packager.package import LambdaAutoPackage
+
+_RECORD_FIELDS = [
+    "name",
+    "levelno",
+    "levelname",
+    "pathname",
+    "filename",
+    "module",
+    "lineno",
+    "funcName",
+    "created",
+    "msecs",
+]
+
+
+class _SocketLogHandler(logging.Handler):
+    def __init__(self, wfile):
+        super().__init__()
+        self.wfile = wfile
+
+    def emit(self, record):
+        fields = {field: getattr(record, field) for field in _RECORD_FIELDS}
+        fields["msg"] = record.getMessage()
+        send_message(self.wfile, {"record": fields})
+
+
+class _BuildHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        options = json.loads(self.rfile.readline())
+        log_level = logging.getLevelName(options["log_level"])
+
+        logger = logging.getLogger()
+        previous_level = logger.level
+        handler = _SocketLogHandler(self.wfile)
+        handler.setLevel(log_level)
+        logger.setLevel(min(log_level, previous_level or logging.WARNING))
+        logger.addHandler(handler)
+
+        package = None
+        try:
+            package = LambdaAutoPackage(
+                logger=logger,
+                project_directory=Path(options["project_directory"]),
+                state=self.server.state,
+            )
+            if options.get("installer"):
+                package.config.installer = options["installer"]
+            package.execute()
+            response = {"exit": 0}
+        except Exception as e:
+            response = {"exit": 1, "error": str(e)}
+        finally:
+            logger.removeHandler(handler)
+            logger.setLevel(previous_level)
+            if package:
+                package.cleanup()
+
+        if response["exit"]:
+            logging.error(
+                f"build of '{options['project_directory']}' failed: {response['error']}"
+            )
+        send_message(self.wfile, response)
+
+
+class BuildServer(socketserver.UnixStreamServer):
+    """Serves one build at a time, as the build changes process wide logging"""
+
+    def __init__(self, socket_path, state):
+        self.state = state
+        super().__init__(str(socket_path), _BuildHandler)
+
+
+def parse_args(args):
+    parser = argparse.ArgumentParser(
+        description="Keep lambda-packager caches warm between builds, serving them over a unix socket"
+    )
+    parser.add_argument(
+        "--socket",
+        dest="socket",
+        required=True,
+        help="path of the unix socket to listen on",
+    )
+    parser.add_argument(
+        "--max-dependencies",
+        dest="max_dependencies",
+        required=False,
+        type=int,
+        default=DEFAULT_MAX_DEPENDENCIES,
+        help=f"how many installed dependency trees to keep, least recently used first out, defaults to {DEFAULT_MAX_DEPENDENCIES}",
+    )
+    logging_default = logging.getLevelName(logging.INFO)
+    parser.add_argument(
+        "-l",
+        "--log-level",
+        dest="log_level",
+        required=False,
+        default=logging_default,
+        help=f"set output verbosity of the daemon itself, defaults to '{logging_default}'",
+        choices=[
+            logging.getLevelName(logging.DEBUG),
+            logging.getLevelName(logging.INFO),
+            logging.getLevelName(logging.WARNING),
+            logging.getLevelName(logging.ERROR),
+        ],
+    )
+    return parser.parse_args(args)
+
+
+def run_daemon():
+    args = parse_args(sys.argv[1:])
+
+    log_level = logging.getLevelName(args.log_level)
+    logger = logging.getLogger()
+    logger.setLevel(log_level)
+    ch = logging.StreamHandler()
+    ch.setFormatter(CustomLogFormatter())
+    ch.setLevel(log_level)
+    logger.addHandler(ch)
+
+    socket_path = Path(args.socket)
+    if socket_path.is_socket():
+        socket_path.unlink()
+
+    state_directory = tempfile.mkdtemp(prefix="lambda-packager-daemon-")
+    state = BuildState(state_directory, max_dependencies=args.max_dependencies)
+    try:
+        with BuildServer(socket_path, state) as server:
+            logger.info(f"listening on {socket_path}")
+            server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("shutting down")
+    finally:
+        # installs kept under a project's staging directory are outside the state directory
+        state.clear()
+        shutil.rmtree(state_directory, ignore_errors=True)
+        if socket_path.is_socket():
+            socket_path.unlink()
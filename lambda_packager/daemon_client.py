@@ -0,0 +1,35 @@
+import json
+import logging
+import socket
+
+# only the standard library is imported here, so forwarding a build to the daemon
+# does not pay for importing the packaging code it is trying to avoid running
+
+
+class RemoteBuildFailed(Exception):
+    pass
+
+
+def send_message(wfile, message):
+    wfile.write(json.dumps(message).encode() + b"\n")
+    wfile.flush()
+
+
+def run_remote(socket_path, options, logger):
+    """Forward a build to the daemon listening on socket_path, replaying its logs on logger"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(str(socket_path))
+        with connection.makefile("rwb") as stream:
+            send_message(stream, options)
+            for line in stream:
+                message = json.loads(line)
+                if "record" in message:
+                    logger.handle(logging.makeLogRecord(message["record"]))
+                elif message["exit"]:
+                    raise RemoteBuildFailed(message["error"])
+                else:
+                    return
+
+    raise RemoteBuildFailed(
+        "the daemon closed the connection before the build finished"
+    )
@@ -8,11 +8,12 @@ class PoetryNotInstalled(Exception):
     pass
 
 
-def poetry_is_used(current_directory):
-    pyproject = current_directory.joinpath("pyproject.toml")
-    if not pyproject.is_file():
-        return False
-    config = tomli.loads(pyproject.read_text())
+def poetry_is_used(current_directory, config=None):
+    if config is None:
+        pyproject = current_directory.joinpath("pyproject.toml")
+        if not pyproject.is_file():
+            return False
+        config = tomli.loads(pyproject.read_text())
 
     try:
         requires = config["build-system"]["requires"][0].startswith("poetry")
@@ -1,17 +1,50 @@
 import logging
+import shutil
 import subprocess
 import sys
+import tempfile
 from pathlib import Path
 
+from lambda_packager.handle_wheel_store import unpack_wheel
 
-def install_requirements_txt(target, requirements_file_path: Path, no_deps=False):
+PIP = "pip"
+UV = "uv"
+WHEEL = "wheel"
+INSTALLERS = [PIP, UV, WHEEL]
+
+
+def install_requirements_txt(
+    target, requirements_file_path: Path, no_deps=False, installer=PIP, platform=None
+):
     # https://pip.pypa.io/en/stable/user_guide/#using-pip-from-your-program
     if not requirements_file_path.is_file():
         raise ValueError(
             f"could not find requirements.txt file at '{requirements_file_path}'"
         )
+    if installer not in INSTALLERS:
+        raise ValueError(
+            f"installer '{installer}' is not valid. should be one of {INSTALLERS}"
+        )
+
+    if installer == UV and shutil.which("uv") is None:
+        logging.warning("uv could not be found in your path, falling back to pip")
+        installer = PIP
+
+    logging.info(f"installing {installer} requirements to '{target}'")
+    if installer == WHEEL:
+        return _install_wheels(target, requirements_file_path, no_deps, platform)
+
+    if installer == UV:
+        cmd = _uv_command(target, requirements_file_path, no_deps, platform)
+    else:
+        cmd = _pip_command(target, requirements_file_path, no_deps, platform)
+
+    output = subprocess.check_output(cmd)
+    logging.debug(output.decode())
+    return output
+
 
-    logging.info(f"installing pip requirements to '{target}'")
+def _pip_command(target, requirements_file_path, no_deps, platform):
     cmd = [
         sys.executable,
         "-m",
@@ -24,7 +57,70 @@ def install_requirements_txt(target, requirements_file_path: Path, no_deps=False
     ]
     if no_deps:
         cmd.append("--no-deps")
+    if platform:
+        cmd.extend(["--platform", platform, "--only-binary=:all:"])
+    return cmd
 
-    output = subprocess.check_output(cmd)
-    logging.debug(output.decode())
+
+def _uv_command(target, requirements_file_path, no_deps, platform):
+    cmd = [
+        "uv",
+        "pip",
+        "install",
+        "--python",
+        sys.executable,
+        "-r",
+        requirements_file_path,
+        "--target",
+        target,
+    ]
+    if no_deps:
+        cmd.append("--no-deps")
+    if platform:
+        cmd.extend(["--python-platform", _uv_platform(platform)])
+    return cmd
+
+
+def _uv_platform(platform):
+    # uv names platforms arch first, e.g. manylinux2014_x86_64 -> x86_64-manylinux2014
+    for arch in ("x86_64", "aarch64"):
+        if platform.endswith(f"_{arch}"):
+            return f"{arch}-{platform[: -len(arch) - 1]}"
+    return platform
+
+
+def _install_wheels(target, requirements_file_path, no_deps, platform):
+    with tempfile.TemporaryDirectory() as download_dir:
+        cmd = [
+            sys.executable,
+            "-m",
+            "pip",
+            "download",
+            "-r",
+            requirements_file_path,
+            "--dest",
+            download_dir,
+            "--only-binary=:all:",
+        ]
+        if no_deps:
+            cmd.append("--no-deps")
+        if platform:
+            cmd.extend(["--platform", platform])
+
+        try:
+            output = subprocess.check_output(cmd)
+        except subprocess.CalledProcessError:
+            # pip download fails as a whole when any requirement only has an sdist
+            logging.warning(
+                "could not download a wheel for every requirement, falling back to pip"
+            )
+            cmd = _pip_command(target, requirements_file_path, no_deps, platform)
+            output = subprocess.check_output(cmd)
+            logging.debug(output.decode())
+            return output
+        logging.debug(output.decode())
+
+        for wheel in sorted(Path(download_dir).glob("*.whl")):
+            logging.debug("unpacking %s", wheel.name)
+            unpack_wheel(wheel, Path(target))
     return output
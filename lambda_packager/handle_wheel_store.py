@@ -0,0 +1,173 @@
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import zipfile
+from pathlib import Path, PurePosixPath
+
+
+def install_from_wheel_store(
+    target,
+    requirements_file_path: Path,
+    store_directory: Path,
+    no_deps=False,
+    platform=None,
+):
+    """
+    Install requirements into target by linking from a shared store of unpacked wheels.
+
+    The store holds one unpacked copy per wheel file name, which encodes the
+    (name, version, wheel tag) triple, so projects that pin the same packages share them.
+    """
+    if not requirements_file_path.is_file():
+        raise ValueError(
+            f"could not find requirements.txt file at '{requirements_file_path}'"
+        )
+
+    store_directory = Path(store_directory)
+    wheels_dir = store_directory.joinpath("wheels")
+    unpacked_dir = store_directory.joinpath("unpacked")
+    wheels_dir.mkdir(parents=True, exist_ok=True)
+    unpacked_dir.mkdir(parents=True, exist_ok=True)
+
+    logging.info(
+        f"installing requirements to '{target}' from store '{store_directory}'"
+    )
+    with tempfile.TemporaryDirectory() as resolved_dir:
+        _resolve_wheels(
+            requirements_file_path, resolved_dir, wheels_dir, no_deps, platform
+        )
+
+        for wheel in sorted(Path(resolved_dir).glob("*.whl")):
+            stored_wheel = _add_to_store(wheel, wheels_dir)
+            unpacked = _unpack_into_store(stored_wheel, unpacked_dir)
+            link_tree(unpacked, Path(target))
+
+
+def unpack_wheel(wheel_path: Path, target: Path):
+    """Unpack a wheel into target using the same layout as `pip install --target`"""
+    target = Path(target)
+    with zipfile.ZipFile(wheel_path) as wheel:
+        for member in wheel.infolist():
+            if member.is_dir():
+                continue
+
+            destination = _install_location(member.filename, target)
+            if destination is None:
+                logging.debug("skipping wheel entry %s", member.filename)
+                continue
+
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            with wheel.open(member) as src, open(destination, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+
+            mode = (member.external_attr >> 16) & 0o777
+            if mode & 0o111:
+                destination.chmod(mode)
+
+
+def _install_location(name, target: Path):
+    parts = PurePosixPath(name).parts
+    if not parts or parts[0] == "/" or ".." in parts:
+        raise ValueError(f"refusing to unpack unsafe wheel entry '{name}'")
+
+    if parts[0].endswith(".data") and len(parts) > 2:
+        scheme, relative = parts[1], parts[2:]
+        if scheme in ("purelib", "platlib", "data"):
+            return target.joinpath(*relative)
+        if scheme == "scripts":
+            return target.joinpath("bin", *relative)
+        return None
+
+    return target.joinpath(*parts)
+
+
+def _resolve_wheels(requirements_file_path, wheel_dir, find_links, no_deps, platform):
+    if platform:
+        # pip can only build wheels for the current platform, so download binaries instead
+        cmd = [
+            sys.executable,
+            "-m",
+            "pip",
+            "download",
+            "-r",
+            requirements_file_path,
+            "--dest",
+            wheel_dir,
+            "--find-links",
+            find_links,
+            "--only-binary=:all:",
+            "--platform",
+            platform,
+        ]
+    else:
+        cmd = [
+            sys.executable,
+            "-m",
+            "pip",
+            "wheel",
+            "-r",
+            requirements_file_path,
+            "--wheel-dir",
+            wheel_dir,
+            "--find-links",
+            find_links,
+        ]
+    if no_deps:
+        cmd.append("--no-deps")
+
+    output = subprocess.check_output(cmd)
+    logging.debug(output.decode())
+
+
+def _add_to_store(wheel: Path, wheels_dir: Path):
+    stored_wheel = wheels_dir.joinpath(wheel.name)
+    if not stored_wheel.is_file():
+        # copy then rename so that concurrent builds never see a partial wheel
+        fd, tmp_path = tempfile.mkstemp(dir=wheels_dir, suffix=".partial")
+        os.close(fd)
+        shutil.copyfile(wheel, tmp_path)
+        os.replace(tmp_path, stored_wheel)
+    return stored_wheel
+
+
+def _unpack_into_store(stored_wheel: Path, unpacked_dir: Path):
+    destination = unpacked_dir.joinpath(stored_wheel.name[: -len(".whl")])
+    if destination.is_dir():
+        logging.debug("reusing unpacked wheel %s", destination)
+        return destination
+
+    tmp_dir = Path(tempfile.mkdtemp(dir=unpacked_dir, suffix=".partial"))
+    try:
+        unpack_wheel(stored_wheel, tmp_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    try:
+        os.rename(tmp_dir, destination)
+    except OSError:
+        # another build unpacked the same wheel first
+        if not destination.is_dir():
+            raise
+        shutil.rmtree(tmp_dir)
+    return destination
+
+
+def link_tree(source: Path, target: Path):
+    for root, _dirs, files in os.walk(source):
+        relative_root = Path(root).relative_to(source)
+        target_root = target.joinpath(relative_root)
+        target_root.mkdir(parents=True, exist_ok=True)
+
+        for file in files:
+            src = Path(root, file)
+            dst = target_root.joinpath(file)
+            if dst.exists() or dst.is_symlink():
+                dst.unlink()
+            try:
+                os.link(src, dst)
+            except OSError:
+                # hard links cannot cross filesystems
+                shutil.copy2(src, dst)
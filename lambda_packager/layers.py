@@ -0,0 +1,202 @@
+import csv
+import json
+import logging
+from pathlib import Path
+
+from lambda_packager.archive import create_zip, walk_entries
+
+# https://docs.aws.amazon.com/lambda/latest/dg/gettingstarted-limits.html
+MAX_LAYERS = 5
+MAX_UNZIPPED_SIZE = 262_144_000
+# the largest zip that can be uploaded directly rather than through s3
+DEFAULT_LAYER_SIZE_LIMIT = 50 * 1024 * 1024
+
+FUNCTION_ZIP = "lambda.zip"
+LAYOUT_MANIFEST = "lambda-layout.json"
+LAYER_PREFIX = "python/"
+
+
+class PackageTooLarge(Exception):
+    pass
+
+
+class Distribution:
+    def __init__(self, name, files, size):
+        self.name = name
+        self.files = files
+        self.size = size
+
+
+class Bin:
+    def __init__(self, zip_name, capacity):
+        self.zip_name = zip_name
+        self.capacity = capacity
+        self.files = []
+        self.size = 0
+        self.distributions = []
+
+    def fits(self, size):
+        return self.size + size <= self.capacity
+
+    def add(self, files, size, distribution=None):
+        self.files.extend(files)
+        self.size += size
+        if distribution:
+            self.distributions.append(distribution)
+
+    def to_manifest(self, dist_dir: Path):
+        return {
+            "zip": self.zip_name,
+            "unzipped_size": self.size,
+            "zipped_size": dist_dir.joinpath(self.zip_name).stat().st_size,
+            "distributions": sorted(self.distributions),
+        }
+
+
+def find_distributions(staging_dir: Path):
+    """Group the staged files by the installed distribution that owns them, using each RECORD file"""
+    staging_dir = Path(staging_dir).resolve()
+    distributions = []
+    for record in sorted(staging_dir.glob("*.dist-info/RECORD")):
+        files = set()
+        with open(record, newline="") as f:
+            for row in csv.reader(f):
+                if not row:
+                    continue
+                path = staging_dir.joinpath(row[0]).resolve()
+                # scripts are recorded relative to the original install scheme
+                if path.is_file() and staging_dir in path.parents:
+                    files.add(path.relative_to(staging_dir))
+        files.add(record.relative_to(staging_dir))
+
+        name = record.parent.name[: -len(".dist-info")]
+        size = sum(staging_dir.joinpath(file).stat().st_size for file in files)
+        distributions.append(Distribution(name, sorted(files), size))
+    return distributions
+
+
+def plan_layout(staging_dir: Path, max_layers, layer_size_limit):
+    """
+    Bin-pack distributions by installed size across up to max_layers layers, then the function zip.
+
+    A layer zip is never bigger than the files in it, so filling layers up to layer_size_limit
+    unzipped keeps every layer zip under it. The function zip takes whatever is left, as it only
+    has to keep the whole package within lambda's unzipped limit.
+    Nothing is split when the whole package fits within a single layer_size_limit.
+    """
+    if not 0 < max_layers <= MAX_LAYERS:
+        raise ValueError(
+            f"max_layers '{max_layers}' is not valid. should be between 1 and {MAX_LAYERS}"
+        )
+
+    distributions = find_distributions(staging_dir)
+    owned = {file for distribution in distributions for file in distribution.files}
+
+    # the total is checked against MAX_UNZIPPED_SIZE below, so the function can take any remainder
+    function = Bin(FUNCTION_ZIP, MAX_UNZIPPED_SIZE)
+    remainder = [
+        Path(relative)
+        for path, relative, is_dir in walk_entries(Path(staging_dir))
+        if not is_dir and Path(relative) not in owned
+    ]
+    remainder_size = sum(
+        Path(staging_dir).joinpath(file).stat().st_size for file in remainder
+    )
+    function.add(remainder, remainder_size)
+
+    total_size = remainder_size + sum(d.size for d in distributions)
+    if total_size > MAX_UNZIPPED_SIZE:
+        raise PackageTooLarge(
+            f"package is {total_size} bytes unzipped which is over the lambda limit of {MAX_UNZIPPED_SIZE} bytes"
+        )
+
+    layers = []
+    if total_size <= layer_size_limit:
+        for distribution in distributions:
+            function.add(distribution.files, distribution.size, distribution.name)
+        return function, layers
+
+    for distribution in sorted(distributions, key=lambda d: (-d.size, d.name)):
+        candidates = list(layers)
+        if len(layers) < max_layers:
+            candidates.append(
+                Bin(f"layer-{len(layers) + 1}.zip", capacity=layer_size_limit)
+            )
+        candidates.append(function)
+
+        chosen = next(c for c in candidates if c.fits(distribution.size))
+        if chosen is not function and chosen not in layers:
+            layers.append(chosen)
+        chosen.add(distribution.files, distribution.size, distribution.name)
+
+    return function, layers
+
+
+def remove_split_outputs(dist_dir: Path):
+    """Remove layer zips and the layout manifest left by an earlier split build"""
+    for stale in [*Path(dist_dir).glob("layer-*.zip"), Path(dist_dir, LAYOUT_MANIFEST)]:
+        if stale.is_file():
+            stale.unlink()
+
+
+def write_split_package(
+    staging_dir: Path,
+    dist_dir: Path,
+    max_layers,
+    layer_size_limit=DEFAULT_LAYER_SIZE_LIMIT,
+    compression_policy=None,
+    progress=None,
+):
+    """Write the function zip, any layer zips and a manifest describing the layout"""
+    function, layers = plan_layout(staging_dir, max_layers, layer_size_limit)
+
+    dist_dir = Path(dist_dir)
+    dist_dir.mkdir(parents=True, exist_ok=True)
+    remove_split_outputs(dist_dir)
+
+    if layers:
+        # the plan works on unzipped sizes, but a package that zips small enough
+        # can still be uploaded as a single zip, so check the real zipped size first
+        unsplit, _ = plan_layout(staging_dir, max_layers, MAX_UNZIPPED_SIZE)
+        create_zip(
+            staging_dir,
+            dist_dir.joinpath(FUNCTION_ZIP),
+            compression_policy=compression_policy,
+            files=unsplit.files,
+            progress=progress,
+        )
+        if dist_dir.joinpath(FUNCTION_ZIP).stat().st_size <= layer_size_limit:
+            logging.info(
+                f"not splitting as the package zips to under {layer_size_limit} bytes"
+            )
+            return _write_manifest(dist_dir, unsplit, [])
+
+    create_zip(
+        staging_dir,
+        dist_dir.joinpath(function.zip_name),
+        compression_policy=compression_policy,
+        files=function.files,
+        progress=progress,
+    )
+    for layer in layers:
+        logging.info(
+            f"writing {layer.zip_name} with {len(layer.distributions)} distributions ({layer.size} bytes unzipped)"
+        )
+        create_zip(
+            staging_dir,
+            dist_dir.joinpath(layer.zip_name),
+            compression_policy=compression_policy,
+            files=layer.files,
+            prefix=LAYER_PREFIX,
+            progress=progress,
+        )
+    return _write_manifest(dist_dir, function, layers)
+
+
+def _write_manifest(dist_dir: Path, function, layers):
+    manifest = {
+        "function": function.to_manifest(dist_dir),
+        "layers": [layer.to_manifest(dist_dir) for layer in layers],
+    }
+    dist_dir.joinpath(LAYOUT_MANIFEST).write_text(json.dumps(manifest, indent=2))
+    return manifest
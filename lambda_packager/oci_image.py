@@ -0,0 +1,314 @@
+import copy
+import gzip
+import hashlib
+import io
+import json
+import logging
+import tarfile
+import tempfile
+from pathlib import Path, PurePosixPath
+
+from lambda_packager.archive import walk_entries
+from lambda_packager.layers import find_distributions
+
+# https://github.com/opencontainers/image-spec/blob/main/image-layout.md
+IMAGE_TAR = "lambda-image.tar"
+TASK_ROOT = "var/task"
+
+INDEX_MEDIA_TYPE = "application/vnd.oci.image.index.v1+json"
+DOCKER_MANIFEST_LIST_MEDIA_TYPE = (
+    "application/vnd.docker.distribution.manifest.list.v2+json"
+)
+MANIFEST_MEDIA_TYPE = "application/vnd.oci.image.manifest.v1+json"
+CONFIG_MEDIA_TYPE = "application/vnd.oci.image.config.v1+json"
+LAYER_MEDIA_TYPE = "application/vnd.oci.image.layer.v1.tar+gzip"
+
+# pip writes timestamp based .pyc files, which would change the layer digest on every build
+EXCLUDED_DIRECTORIES = {"__pycache__"}
+
+
+class InvalidBaseImage(Exception):
+    pass
+
+
+class _HashingWriter:
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self.sha256.update(data)
+        self.size += len(data)
+        return self.fileobj.write(data)
+
+    def digest(self):
+        return f"sha256:{self.sha256.hexdigest()}"
+
+
+class Blob:
+    def __init__(self, media_type, digest, size, path=None, data=None):
+        self.media_type = media_type
+        self.digest = digest
+        self.size = size
+        self.path = path
+        self.data = data
+
+    def descriptor(self):
+        return {"mediaType": self.media_type, "digest": self.digest, "size": self.size}
+
+
+class BaseImage:
+    """
+    An image read from an OCI image layout directory, such as one written by
+    `skopeo copy docker://public.ecr.aws/lambda/python:3.12 oci:<directory>`
+    """
+
+    def __init__(self, layout_dir: Path, architecture="amd64"):
+        self.layout_dir = Path(layout_dir)
+        index_path = self.layout_dir.joinpath("index.json")
+        if not index_path.is_file():
+            raise InvalidBaseImage(
+                f"'{self.layout_dir}' is not an OCI image layout, it has no index.json"
+            )
+
+        descriptor = self._select(json.loads(index_path.read_text()), architecture)
+        if descriptor is None:
+            raise InvalidBaseImage(
+                f"'{self.layout_dir}' has no linux/{architecture} image"
+            )
+        self.digest = descriptor["digest"]
+        self.manifest = json.loads(self._read(self.digest))
+        self.config = json.loads(self._read(self.manifest["config"]["digest"]))
+        if self.config.get("architecture", architecture) != architecture:
+            raise InvalidBaseImage(
+                f"'{self.layout_dir}' is a {self.config['architecture']} image, not {architecture}"
+            )
+        self.layers = []
+        for layer in self.manifest["layers"]:
+            path = self._blob_path(layer["digest"])
+            if not path.is_file():
+                raise InvalidBaseImage(f"base image layer {layer['digest']} is missing")
+            self.layers.append(
+                Blob(layer["mediaType"], layer["digest"], layer["size"], path=path)
+            )
+
+    def _blob_path(self, digest):
+        algorithm, _, encoded = digest.partition(":")
+        return self.layout_dir.joinpath("blobs", algorithm, encoded)
+
+    def _read(self, digest):
+        try:
+            return self._blob_path(digest).read_bytes()
+        except FileNotFoundError:
+            raise InvalidBaseImage(f"base image blob {digest} is missing")
+
+    def _select(self, index, architecture):
+        """Find the image manifest for linux/architecture, following nested indexes"""
+        for descriptor in index.get("manifests", []):
+            platform = descriptor.get("platform")
+            if platform and (
+                platform.get("os") != "linux"
+                or platform.get("architecture") != architecture
+            ):
+                continue
+            if descriptor["mediaType"] in (
+                INDEX_MEDIA_TYPE,
+                DOCKER_MANIFEST_LIST_MEDIA_TYPE,
+            ):
+                nested = json.loads(self._read(descriptor["digest"]))
+                found = self._select(nested, architecture)
+                if found:
+                    return found
+            else:
+                return descriptor
+        return None
+
+
+def write_oci_image(
+    staging_dir: Path,
+    target: Path,
+    cmd=None,
+    architecture="amd64",
+    tag="latest",
+    progress=None,
+    base=None,
+):
+    """
+    Write an OCI image layout tarball with the dependencies and the source files in separate layers.
+
+    Layers are built deterministically so unchanged dependencies always produce the same layer digest.
+    With a BaseImage the layers go on top of its layers and its config, giving a complete image.
+    Without one the image only holds the two layers, and cmd is rejected as it would have no effect.
+    """
+    if cmd and base is None:
+        raise ValueError("an image cmd needs a base image to run in")
+    staging_dir = Path(staging_dir)
+    owned = {
+        file.as_posix()
+        for distribution in find_distributions(staging_dir)
+        for file in distribution.files
+    }
+    files = [
+        relative
+        for _path, relative, is_dir in walk_entries(staging_dir)
+        if not is_dir and EXCLUDED_DIRECTORIES.isdisjoint(relative.split("/"))
+    ]
+    dependency_files = [file for file in files if file in owned]
+    source_files = [file for file in files if file not in owned]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        layers = []
+        diff_ids = []
+        for name, layer_files in [
+            ("dependencies", dependency_files),
+            ("source", source_files),
+        ]:
+            layer, diff_id = _write_layer(
+                staging_dir, layer_files, Path(tmp, name), progress
+            )
+            logging.info(f"{name} layer {layer.digest} ({len(layer_files)} files)")
+            layers.append(layer)
+            diff_ids.append(diff_id)
+
+        if base is not None:
+            config = _json_blob(CONFIG_MEDIA_TYPE, _extend_config(base, cmd, diff_ids))
+            layers = base.layers + layers
+        else:
+            config = _json_blob(
+                CONFIG_MEDIA_TYPE,
+                {
+                    "architecture": architecture,
+                    "os": "linux",
+                    "config": _image_config(),
+                    "rootfs": {"type": "layers", "diff_ids": diff_ids},
+                },
+            )
+        manifest = _json_blob(
+            MANIFEST_MEDIA_TYPE,
+            {
+                "schemaVersion": 2,
+                "mediaType": MANIFEST_MEDIA_TYPE,
+                "config": config.descriptor(),
+                "layers": [layer.descriptor() for layer in layers],
+            },
+        )
+        manifest_descriptor = manifest.descriptor()
+        manifest_descriptor["annotations"] = {"org.opencontainers.image.ref.name": tag}
+        index = {
+            "schemaVersion": 2,
+            "mediaType": INDEX_MEDIA_TYPE,
+            "manifests": [manifest_descriptor],
+        }
+
+        Path(target).parent.mkdir(parents=True, exist_ok=True)
+        with tarfile.open(target, "w", format=tarfile.PAX_FORMAT) as image:
+            _add_bytes(image, "oci-layout", _to_json({"imageLayoutVersion": "1.0.0"}))
+            _add_bytes(image, "index.json", _to_json(index))
+            _add_directory(image, "blobs")
+            _add_directory(image, "blobs/sha256")
+            written = set()
+            for blob in [config, manifest, *layers]:
+                if blob.digest in written:
+                    continue
+                written.add(blob.digest)
+                name = f"blobs/sha256/{blob.digest[len('sha256:'):]}"
+                if blob.data is not None:
+                    _add_bytes(image, name, blob.data)
+                else:
+                    with open(blob.path, "rb") as f:
+                        image.addfile(_tar_info(name, blob.size), f)
+
+    return manifest_descriptor
+
+
+def _image_config(base_config=None, cmd=None):
+    config = dict(base_config or {})
+    env = [
+        variable
+        for variable in config.get("Env") or []
+        if not variable.startswith("LAMBDA_TASK_ROOT=")
+    ]
+    config["Env"] = env + [f"LAMBDA_TASK_ROOT=/{TASK_ROOT}"]
+    config["WorkingDir"] = f"/{TASK_ROOT}"
+    if cmd:
+        config["Cmd"] = list(cmd)
+    return config
+
+
+def _extend_config(base, cmd, diff_ids):
+    """The base image's config with our layers and handler added, keeping its entrypoint and environment"""
+    config = copy.deepcopy(base.config)
+    config["config"] = _image_config(config.get("config"), cmd)
+    config["rootfs"]["diff_ids"] = config["rootfs"]["diff_ids"] + diff_ids
+    if "history" in config:
+        # history entries line up with the layers, so tools expect one per added layer
+        config["history"] += [
+            {"created_by": "lambda-packager dependencies"},
+            {"created_by": "lambda-packager source"},
+        ]
+    return config
+
+
+def _write_layer(staging_dir: Path, files, blob_path: Path, progress=None):
+    with open(blob_path, "wb") as f:
+        compressed = _HashingWriter(f)
+        # a fixed mtime and no file name in the header keep the gzip output reproducible
+        with gzip.GzipFile(
+            filename="", mode="wb", fileobj=compressed, mtime=0
+        ) as gzipped:
+            uncompressed = _HashingWriter(gzipped)
+            with tarfile.open(
+                fileobj=uncompressed, mode="w|", format=tarfile.PAX_FORMAT
+            ) as layer:
+                directories = set()
+                for file in files:
+                    for parent in reversed(PurePosixPath(TASK_ROOT, file).parents):
+                        if parent.name and parent not in directories:
+                            directories.add(parent)
+                            _add_directory(layer, str(parent))
+
+                    path = staging_dir.joinpath(file)
+                    executable = path.stat().st_mode & 0o111
+                    info = _tar_info(
+                        f"{TASK_ROOT}/{file}",
+                        path.stat().st_size,
+                        mode=0o755 if executable else 0o644,
+                    )
+                    with open(path, "rb") as src:
+                        layer.addfile(info, src)
+                    if progress:
+                        progress.add("files")
+                        progress.add("bytes", info.size)
+
+    layer = Blob(LAYER_MEDIA_TYPE, compressed.digest(), compressed.size, path=blob_path)
+    return layer, uncompressed.digest()
+
+
+def _tar_info(name, size, mode=0o644, type=tarfile.REGTYPE):
+    info = tarfile.TarInfo(name)
+    info.size = size
+    info.mode = mode
+    info.type = type
+    info.mtime = 0
+    info.uid = info.gid = 0
+    info.uname = info.gname = ""
+    return info
+
+
+def _add_directory(tar, name):
+    tar.addfile(_tar_info(name, 0, mode=0o755, type=tarfile.DIRTYPE))
+
+
+def _add_bytes(tar, name, data):
+    tar.addfile(_tar_info(name, len(data)), io.BytesIO(data))
+
+
+def _to_json(value):
+    return json.dumps(value, sort_keys=True, separators=(",", ":")).encode()
+
+
+def _json_blob(media_type, value):
+    data = _to_json(value)
+    digest = f"sha256:{hashlib.sha256(data).hexdigest()}"
+    return Blob(media_type, digest, len(data), data=data)
@@ -1,13 +1,38 @@
 import logging
+import os
 import shutil
 import tempfile
+from functools import cached_property
 from pathlib import Path
 
 import tomli
 
+from lambda_packager.archive import CompressionPolicy, create_zip
+from lambda_packager.build_state import directories
 from lambda_packager.config import Config
 from lambda_packager.handle_poetry import poetry_is_used, export_poetry
-from lambda_packager.handle_requirements_txt import install_requirements_txt
+from lambda_packager.handle_requirements_txt import PIP, install_requirements_txt
+from lambda_packager.handle_wheel_store import install_from_wheel_store, link_tree
+from lambda_packager.layers import (
+    FUNCTION_ZIP,
+    LAYOUT_MANIFEST,
+    remove_split_outputs,
+    write_split_package,
+)
+from lambda_packager.oci_image import BaseImage, IMAGE_TAR, write_oci_image
+from lambda_packager.remote_cache import (
+    RemoteCache,
+    RemoteCacheUnavailable,
+    UncacheableRequirements,
+    artifact_key,
+    cache_from_url,
+    dependency_key,
+)
+from lambda_packager.reporting import Reporter
+from lambda_packager.verify_imports import IMPORT_REPORT, verify_imports
+
+
+OUTPUT_FORMATS = ["zip", "oci"]
 
 
 class NoSrcFilesFound(Exception):
@@ -15,7 +40,14 @@ class NoSrcFilesFound(Exception):
 
 
 class LambdaAutoPackage:
-    def __init__(self, config=None, project_directory=None, logger=None):
+    def __init__(
+        self,
+        config=None,
+        project_directory=None,
+        logger=None,
+        state=None,
+        reporter=None,
+    ):
         if project_directory:
             self.project_directory = Path(project_directory)
         else:
@@ -27,123 +59,412 @@ class LambdaAutoPackage:
             self.logger = logging.getLogger(__name__)
             self.logger.debug("set up self logging")
 
+        self.state = state
+
+        if reporter:
+            self.reporter = reporter
+        else:
+            self.reporter = Reporter(self.logger)
+
         if config:
             self.config = config
         else:
-            self.config = LambdaAutoPackage._get_config(
-                self.project_directory.joinpath("pyproject.toml")
+            self.config = LambdaAutoPackage._config_from_pyproject(self.pyproject)
+
+        self.staging_root = self._staging_parent()
+        self.tmp_folder = self._create_tmp_directory(self.staging_root)
+        self.source_folder = None
+        self.base_image = None
+
+    @cached_property
+    def pyproject(self):
+        # parsed once and shared by the config and the poetry check
+        file = self.project_directory.joinpath("pyproject.toml")
+        if not file.is_file():
+            return None
+        if self.state:
+            return self.state.cached(
+                ("pyproject", str(file.resolve())),
+                [file],
+                lambda: tomli.loads(file.read_text()),
             )
+        return tomli.loads(file.read_text())
 
-        self.tmp_folder = self._create_tmp_directory()
+    def cleanup(self):
+        for folder in [self.tmp_folder, self.source_folder]:
+            if folder:
+                shutil.rmtree(folder, ignore_errors=True)
 
     def execute(self):
+        self._check_config()
+        requirements = self._find_requirements()
+
+        dist_dir = self.project_directory.joinpath("dist")
+        remote_cache = self._remote_cache()
+        dependencies = None
+        if requirements and (remote_cache or self.state):
+            try:
+                dependencies = self._dependency_key(requirements)
+            except UncacheableRequirements as e:
+                # the key cannot see changes to local packages, so never reuse their install
+                self.logger.warning(
+                    "building without caching dependencies as %s", e.args[0]
+                )
+                remote_cache = None
+
+        if remote_cache:
+            # the artifact key needs the source files before any dependency is installed,
+            # so they are staged separately and linked in after the dependencies
+            self.source_folder = self._create_tmp_directory(self.staging_root)
+            self._copy_source_files(
+                source_dir=self.project_directory,
+                target_dir=self.source_folder,
+            )
+            artifacts = artifact_key(
+                dependencies, self._cached_config(), self.source_folder
+            )
+            if remote_cache.restore(f"artifacts/{artifacts}", dist_dir):
+                return
+
+        if requirements:
+            self._stage_dependencies(requirements, dependencies, remote_cache)
+
+        # source files win over dependencies with the same path, as they are staged last
+        if self.source_folder:
+            link_tree(self.source_folder, self.tmp_folder)
+        else:
+            self._copy_source_files(
+                source_dir=self.project_directory,
+                target_dir=self.tmp_folder,
+            )
+
+        outputs = self._write_outputs(dist_dir)
+
+        if self.config.verify_imports:
+            verify_imports(
+                self.tmp_folder,
+                dist_dir.joinpath(IMPORT_REPORT),
+                workers=self.config.verify_workers,
+                timeout=self.config.verify_timeout,
+                python=self.config.verify_python,
+                ignore=self.config.verify_ignore,
+            )
+            outputs.append(IMPORT_REPORT)
+
+        if remote_cache:
+            remote_cache.publish(f"artifacts/{artifacts}", dist_dir, files=outputs)
+
+    def _check_config(self):
+        # fail before the slow dependency install rather than after it
+        if self.config.output_format not in OUTPUT_FORMATS:
+            raise ValueError(
+                f"output format '{self.config.output_format}' is not valid. should be one of {OUTPUT_FORMATS}"
+            )
+        if self.config.image_cmd and not self.config.image_base:
+            raise ValueError(
+                "image_cmd only takes effect with an image_base to run in, please set image_base"
+            )
+        if self.config.wheel_store and self.config.installer != PIP:
+            self.logger.warning(
+                "installer '%s' is ignored as dependencies are installed from the wheel store",
+                self.config.installer,
+            )
+        if self.config.output_format == "oci" and self.config.image_base:
+            self.base_image = BaseImage(
+                self.project_directory.joinpath(self.config.image_base),
+                architecture=self.config.image_architecture,
+            )
+
+    def _dependency_key(self, requirements):
+        return dependency_key(
+            *requirements,
+            settings={
+                "installer": self.config.installer,
+                "platform": self.config.platform,
+            },
+        )
+
+    def _stage_dependencies(self, requirements, dependencies, remote_cache):
+        if (
+            self.state
+            and dependencies
+            and self.state.restore_dependencies(dependencies, self.tmp_folder)
+        ):
+            return
+
+        if not (
+            remote_cache
+            and remote_cache.restore(f"dependencies/{dependencies}", self.tmp_folder)
+        ):
+            self._install_requirements(*requirements)
+            if remote_cache:
+                remote_cache.publish(f"dependencies/{dependencies}", self.tmp_folder)
+
+        if self.state and dependencies:
+            self.state.save_dependencies(
+                dependencies, self.tmp_folder, parent=self.staging_root
+            )
+
+    def _find_requirements(self):
         if self.project_directory.joinpath("requirements.txt").is_file():
             self.logger.info("using requirements.txt file in project directory")
-            requirements_file_path = self.project_directory.joinpath("requirements.txt")
-            install_requirements_txt(
-                str(self.tmp_folder), requirements_file_path=requirements_file_path
-            )
-        elif poetry_is_used(self.project_directory):
+            return self.project_directory.joinpath("requirements.txt"), False
+        elif self.pyproject is not None and poetry_is_used(
+            self.project_directory, config=self.pyproject
+        ):
             self.logger.info("using pyproject.toml file in project directory")
             requirements_file_path = self.tmp_folder.joinpath("requirements.txt")
+            self._export_poetry(requirements_file_path)
+            return requirements_file_path, True
+        else:
+            self.logger.warning("No dependency found, none will be packaged")
+            return None
+
+    def _export_poetry(self, requirements_file_path: Path):
+        def export():
             export_poetry(
                 target_path=requirements_file_path,
                 project_directory=self.project_directory,
                 without_hashes=self.config.without_hashes,
             )
-            install_requirements_txt(
-                str(self.tmp_folder),
-                requirements_file_path=requirements_file_path,
-                no_deps=True,
+            return requirements_file_path.read_text()
+
+        if not self.state:
+            export()
+            return
+
+        requirements = self.state.cached(
+            (
+                "poetry export",
+                str(self.project_directory.resolve()),
+                self.config.without_hashes,
+            ),
+            [
+                self.project_directory.joinpath("pyproject.toml"),
+                self.project_directory.joinpath("poetry.lock"),
+            ],
+            export,
+        )
+        requirements_file_path.write_text(requirements)
+
+    def _write_outputs(self, dist_dir: Path):
+        with self.reporter.stage(f"write {self.config.output_format} output") as stage:
+            return self._write_output_format(dist_dir, stage)
+
+    def _write_output_format(self, dist_dir: Path, stage):
+        if self.config.output_format == "oci":
+            write_oci_image(
+                self.tmp_folder,
+                dist_dir.joinpath(IMAGE_TAR),
+                cmd=self.config.image_cmd,
+                architecture=self.config.image_architecture,
+                progress=stage,
+                base=self.base_image,
+            )
+            return [IMAGE_TAR]
+        elif self.config.max_layers:
+            layout = write_split_package(
+                self.tmp_folder,
+                dist_dir,
+                max_layers=self.config.max_layers,
+                layer_size_limit=self.config.layer_size_limit,
+                compression_policy=self._compression_policy(),
+                progress=stage,
             )
+            zips = [layout["function"]] + layout["layers"]
+            return [entry["zip"] for entry in zips] + [LAYOUT_MANIFEST]
         else:
-            self.logger.warning("No dependency found, none will be packaged")
+            # a stale layout from an earlier split build would not describe this zip
+            remove_split_outputs(dist_dir)
+            self._create_zip_file(
+                self.tmp_folder,
+                str(dist_dir.joinpath(FUNCTION_ZIP)),
+                compression_policy=self._compression_policy(),
+                progress=stage,
+            )
+            return [FUNCTION_ZIP]
 
-        self._copy_source_files(
-            source_dir=self.project_directory,
-            target_dir=self.tmp_folder,
+    def _remote_cache(self):
+        if not self.config.remote_cache:
+            return None
+        try:
+            backend = cache_from_url(
+                self.config.remote_cache,
+                endpoint_url=self.config.remote_cache_endpoint_url,
+                base_directory=self.project_directory,
+            )
+        except RemoteCacheUnavailable as e:
+            self.logger.warning(
+                "building without the remote cache as it is unavailable: %s", e.args[0]
+            )
+            return None
+        return RemoteCache(
+            backend,
+            workers=self.config.remote_cache_workers,
+            staging_directory=self.staging_root,
         )
 
-        self._create_zip_file(
-            self.tmp_folder, str(self.project_directory.joinpath("dist/lambda.zip"))
+    def _cached_config(self):
+        config = {
+            key: value
+            for key, value in vars(self.config).items()
+            if not key.startswith("remote_cache")
+        }
+        if self.base_image:
+            # the base image can be updated in place, so key on its content rather than its path
+            config["image_base"] = self.base_image.digest
+        return config
+
+    def _compression_policy(self):
+        return CompressionPolicy(
+            level=self.config.compression_level,
+            overrides=self.config.compression_overrides,
+            store_threshold=self.config.store_threshold,
         )
 
+    def _install_requirements(self, requirements_file_path: Path, no_deps=False):
+        if self.config.wheel_store:
+            install_from_wheel_store(
+                str(self.tmp_folder),
+                requirements_file_path=requirements_file_path,
+                store_directory=self.project_directory.joinpath(
+                    self.config.wheel_store
+                ),
+                no_deps=no_deps,
+                platform=self.config.platform,
+            )
+        else:
+            install_requirements_txt(
+                str(self.tmp_folder),
+                requirements_file_path=requirements_file_path,
+                no_deps=no_deps,
+                installer=self.config.installer,
+                platform=self.config.platform,
+            )
+
+    def _staging_parent(self):
+        # on containers where /tmp is a tmpfs the staged tree is held in memory,
+        # so allow staging on a real disk instead
+        if not self.config.staging_directory:
+            return None
+        parent = self.project_directory.joinpath(self.config.staging_directory)
+        parent.mkdir(parents=True, exist_ok=True)
+        return parent.resolve()
+
     @staticmethod
-    def _create_tmp_directory():
-        dirpath = tempfile.mkdtemp()
+    def _create_tmp_directory(parent=None):
+        dirpath = tempfile.mkdtemp(dir=parent)
         test_path = Path(dirpath)
         assert test_path.exists()
         assert test_path.is_dir()
         return test_path
 
     def _copy_source_files(self, source_dir: Path, target_dir: Path):
-        matching_objects = LambdaAutoPackage._get_matching_files_and_folders(
-            self.config.src_patterns, source_dir
-        )
-
-        self.logger.info(f"copying {len(matching_objects)} matching_objects")
-        self.logger.debug(f"copying {matching_objects} matching_objects")
+        matching_objects = self._matching_files_and_folders(source_dir)
+        self.logger.debug("copying %s matching objects", len(matching_objects))
 
         copied_locations = []
-        for src in matching_objects:
-            relative_path = src.relative_to(source_dir)
-            new_location = target_dir.joinpath(relative_path)
-
-            if self._is_ignored_file(src.resolve()):
-                self.logger.warning(f"skipping path {src.resolve()}")
-            elif src.is_file():
-                self.copy_file(src, new_location, copied_locations)
-            elif src.is_dir():
-                self.copy_directory(src, new_location, copied_locations)
-            else:
-                self.logger.warning(f"the path '{src}' was nether a file or directory")
+        with self.reporter.stage("copy source files") as stage:
+            for src in matching_objects:
+                relative_path = src.relative_to(source_dir)
+                new_location = target_dir.joinpath(relative_path)
+
+                if self._is_ignored_file(src.resolve()):
+                    self.logger.debug("skipping path %s", src)
+                    stage.add("skipped")
+                elif src.is_file():
+                    self.copy_file(src, new_location, copied_locations, stage)
+                elif src.is_dir():
+                    self.copy_directory(src, new_location, copied_locations, stage)
+                else:
+                    self.logger.warning(
+                        "the path '%s' was nether a file or directory", src
+                    )
 
         if len(copied_locations) <= 0:
             raise NoSrcFilesFound(
                 "No src files were found. This is likely a problem. Exiting now to highlight this"
             )
 
-        copied_locations_string = "\n".join(copied_locations)
-        self.logger.info(f"copied the following locations: \n{copied_locations_string}")
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(
+                "copied the following locations: \n%s", "\n".join(copied_locations)
+            )
 
-    def copy_file(self, src, new_location, copied_locations):
-        self.logger.debug(f"about to copy file from {src} --> {new_location}")
+    def copy_file(self, src, new_location, copied_locations, stage=None):
+        self.logger.debug("about to copy file from %s --> %s", src, new_location)
         new_location.parent.mkdir(exist_ok=True, parents=True)
-        copied_locations.append(str(shutil.copyfile(src, new_location)))
+        copied_locations.append(str(LambdaAutoPackage._replace_file(src, new_location)))
+        if stage:
+            stage.add("files")
+
+    def copy_directory(self, src, new_location, copied_locations, stage=None):
+        self.logger.debug("about to copy directory from %s --> %s", src, new_location)
+
+        def copy_function(file_src, file_dst):
+            copied = LambdaAutoPackage._replace_file(
+                file_src, file_dst, copy=shutil.copy2
+            )
+            if stage:
+                stage.add("files")
+            return copied
+
+        ignore = None
+        if (
+            self.config.ignore_hidden_files
+            or self.config.ignore_folders
+            or self.staging_root
+        ):
+
+            def ignore(directory, names):
+                return self._is_ignored_file_list(directory, names, stage)
 
-    def copy_directory(self, src, new_location, copied_locations):
-        self.logger.debug(f"about to copy directory from {src} --> {new_location}")
         copied_locations.append(
             str(
                 shutil.copytree(
                     src=str(src),
                     dst=str(new_location),
                     dirs_exist_ok=True,
-                    ignore=(
-                        self._is_ignored_file_list
-                        if self.config.ignore_hidden_files or self.config.ignore_folders
-                        else None
-                    ),
+                    copy_function=copy_function,
+                    ignore=ignore,
                 )
             )
         )
+        if stage:
+            stage.add("directories")
 
-    def _is_ignored_file_list(self, src, files):
+    @staticmethod
+    def _replace_file(src, dst, copy=shutil.copyfile):
+        # staged dependencies may be hard links into a shared wheel store,
+        # so unlink rather than overwrite them in place
+        if os.path.lexists(dst):
+            os.unlink(dst)
+        return copy(src, dst)
+
+    def _is_ignored_file_list(self, src, files, stage=None):
         if self._is_ignored_file(Path(src).resolve()):
-            self.logger.warning(f"skipping folder {Path(src).resolve()}")
+            self.logger.debug("skipping folder %s", src)
+            if stage:
+                stage.add("skipped", len(files))
             return files
 
-        files_to_skip = {}
+        files_to_skip = set()
         for file in files:
-            path = Path(file).resolve()
-            if self._is_ignored_file(path):
-                files_to_skip[file] = path
+            if self._is_ignored_file(Path(file).resolve()):
+                self.logger.debug("skipping path %s", file)
+                files_to_skip.add(file)
 
-        if files_to_skip:
-            self.logger.warning(f"skipping path {list(files_to_skip.values())}")
-        return files_to_skip.keys()
+        if stage and files_to_skip:
+            stage.add("skipped", len(files_to_skip))
+        return files_to_skip
 
     def _is_ignored_file(self, resolved_path: Path):
+        if self.staging_root and (
+            resolved_path == self.staging_root
+            or self.staging_root in resolved_path.parents
+        ):
+            return True
+
         path = str(resolved_path)
 
         if self.config.ignore_hidden_files:
@@ -156,29 +477,68 @@ class LambdaAutoPackage:
 
         return False
 
+    def _matching_files_and_folders(self, source_dir: Path):
+        def walk():
+            return LambdaAutoPackage._get_matching_files_and_folders(
+                self.config.src_patterns, source_dir, pruned=self._is_staging_root
+            )
+
+        if not self.state:
+            return walk()
+
+        # a directory's mtime changes whenever an entry in it is added, removed or renamed.
+        # matches inside ignored directories are skipped when copying, whether or not they are stale
+        return self.state.cached_walk(
+            (
+                "file walk",
+                str(source_dir.resolve()),
+                tuple(self.config.src_patterns),
+                self.config.ignore_hidden_files,
+                tuple(self.config.ignore_folders),
+                str(self.staging_root),
+            ),
+            lambda: directories(
+                source_dir, ignored=lambda path: self._is_ignored_file(path.resolve())
+            ),
+            walk,
+        )
+
+    def _is_staging_root(self, path: Path):
+        return self.staging_root is not None and path.resolve() == self.staging_root
+
     @staticmethod
-    def _get_matching_files_and_folders(pattern_list, source_dir):
+    def _get_matching_files_and_folders(pattern_list, source_dir, pruned=None):
+        # the same matches as rglob, but pruned directories are never walked,
+        # such as a staging directory holding the installed dependencies
         matching_objects = set()
-        for pattern in pattern_list:
-            matching_objects.update(source_dir.rglob(pattern))
+        for directory in directories(source_dir, ignored=pruned):
+            for pattern in pattern_list:
+                matching_objects.update(Path(directory).glob(pattern))
 
         return matching_objects
 
     @staticmethod
-    def _create_zip_file(source_dir, target):
+    def _create_zip_file(
+        source_dir,
+        target,
+        compression_policy=None,
+        progress=None,
+    ):
         if target.endswith(".zip"):
             Path(target).parent.mkdir(exist_ok=True)
-            name = target[: -len(".zip")]
-            shutil.make_archive(base_name=name, format="zip", root_dir=source_dir)
+            create_zip(
+                source_dir,
+                target,
+                compression_policy=compression_policy,
+                progress=progress,
+            )
         else:
             raise ValueError(
                 f"given target path '{target}' does not end with correct extension. should end with '.zip'"
             )
 
     @staticmethod
-    def _read_config(file: Path):
-        config = tomli.loads(file.read_text())
-
+    def _config_section(config):
         try:
             return config["tool"]["lambda-packager"]
         except KeyError:
@@ -187,9 +547,13 @@ class LambdaAutoPackage:
 
     @staticmethod
     def _get_config(file: Path):
-        if not file.is_file():
+        pyproject = tomli.loads(file.read_text()) if file.is_file() else None
+        return LambdaAutoPackage._config_from_pyproject(pyproject)
+
+    @staticmethod
+    def _config_from_pyproject(pyproject):
+        if pyproject is None:
             logging.warning("no config file found!")
             return Config()
 
-        config_dict = LambdaAutoPackage._read_config(file)
-        return Config(**config_dict)
+        return Config(**LambdaAutoPackage._config_section(pyproject))
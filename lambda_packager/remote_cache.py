@@ -0,0 +1,369 @@
+import hashlib
+import json
+import logging
+import os
+import platform
+import re
+import sys
+import tarfile
+import tempfile
+import threading
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from lambda_packager.archive import walk_entries
+from lambda_packager.handle_wheel_store import link_tree
+
+# bump when the layout of cached entries changes so old entries are never restored
+CACHE_VERSION = 1
+DEFAULT_BLOB_SIZE = 8 * 1024 * 1024
+DEFAULT_WORKERS = 8
+
+INCLUDE_OPTIONS = ["-r", "--requirement", "-c", "--constraint"]
+PATH_OPTIONS = ["-e", "--editable", "-f", "--find-links"]
+# the same comment syntax as pip's requirements file parser
+COMMENT = re.compile(r"(^|\s+)#.*$")
+
+
+class RemoteCacheUnavailable(Exception):
+    pass
+
+
+class CorruptCacheEntry(Exception):
+    pass
+
+
+class UncacheableRequirements(Exception):
+    pass
+
+
+class FileSystemCache:
+    """Cache backend for a directory shared between build agents, such as an NFS or EFS mount"""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    def get(self, key):
+        try:
+            return self.directory.joinpath(key).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key, data):
+        path = self.directory.joinpath(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # write then rename so readers never see a partially written object
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".partial")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+class S3Cache:
+    """Cache backend for S3 or any S3 compatible endpoint"""
+
+    def __init__(self, bucket, prefix="", endpoint_url=None, client=None):
+        if client is None:
+            try:
+                import boto3
+            except ImportError as e:
+                raise RemoteCacheUnavailable(
+                    "Please make sure you have boto3 installed to use an s3 remote cache",
+                    e,
+                )
+            client = boto3.client("s3", endpoint_url=endpoint_url)
+
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+
+    def _key(self, key):
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def get(self, key):
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self._key(key))
+        except self.client.exceptions.NoSuchKey:
+            return None
+        return response["Body"].read()
+
+    def put(self, key, data):
+        self.client.put_object(Bucket=self.bucket, Key=self._key(key), Body=data)
+
+
+def cache_from_url(url, endpoint_url=None, base_directory=None):
+    """
+    Create a backend from 's3://bucket/prefix', 'file:///path' or a plain directory path.
+
+    Relative directory paths are resolved from base_directory, or the current directory without one.
+    """
+    if url.startswith("s3://"):
+        bucket, _, prefix = url[len("s3://") :].partition("/")
+        return S3Cache(bucket, prefix, endpoint_url=endpoint_url)
+    if url.startswith("file://"):
+        url = url[len("file://") :]
+    if base_directory is not None:
+        url = Path(base_directory).joinpath(url)
+    return FileSystemCache(url)
+
+
+def _environment():
+    return [
+        f"cache-version={CACHE_VERSION}",
+        f"python={sys.version_info[0]}.{sys.version_info[1]}",
+        f"platform={sys.platform}-{platform.machine()}",
+    ]
+
+
+def dependency_key(requirements_file_path: Path, no_deps=False, settings=None):
+    """Key for an installed dependency tree, from the requirements and anything that changes how they install"""
+    digest = hashlib.sha256()
+    for part in _environment():
+        digest.update(part.encode() + b"\0")
+    digest.update(json.dumps(settings or {}, sort_keys=True).encode() + b"\0")
+    digest.update(f"no-deps={no_deps}".encode() + b"\0")
+    _update_with_requirements(digest, Path(requirements_file_path), set())
+    return digest.hexdigest()
+
+
+def _update_with_requirements(digest, requirements_file_path: Path, seen):
+    # included requirement and constraint files change the install as much as the file itself
+    requirements_file_path = requirements_file_path.resolve()
+    if requirements_file_path in seen:
+        return
+    seen.add(requirements_file_path)
+    digest.update(requirements_file_path.read_bytes() + b"\0")
+
+    for line in _requirement_lines(requirements_file_path):
+        option, value = _split_option(line)
+        if option in INCLUDE_OPTIONS and "://" not in value:
+            # pip resolves includes from the including file
+            included = requirements_file_path.parent.joinpath(value)
+            _update_with_requirements(digest, included, seen)
+        elif option in PATH_OPTIONS or option is None:
+            if _is_local_path(value):
+                raise UncacheableRequirements(
+                    f"'{value}' in '{requirements_file_path}' points at a local path"
+                )
+
+
+def _requirement_lines(requirements_file_path: Path):
+    line = ""
+    for physical_line in requirements_file_path.read_text().splitlines():
+        physical_line = COMMENT.sub("", physical_line)
+        if physical_line.endswith("\\"):
+            line += physical_line[:-1]
+            continue
+        line = (line + physical_line).strip()
+        if line:
+            yield line
+        line = ""
+    if line.strip():
+        yield line.strip()
+
+
+def _split_option(line):
+    """Split a requirements line into its option and value, with no option for a requirement"""
+    if not line.startswith("-"):
+        # environment markers say nothing about where the requirement comes from
+        return None, line.split(";")[0].strip()
+
+    first, _, rest = line.partition(" ")
+    option, equals, value = first.partition("=")
+    if not equals:
+        value = rest
+    if not option.startswith("--") and len(option) > 2:
+        # short options can be written without a space, e.g. -rbase.txt
+        option, value = option[:2], option[2:]
+    return option, value.strip()
+
+
+def _is_local_path(value):
+    if "file:" in value:
+        return True
+    if "://" in value:
+        return False
+    return value.startswith((".", "/", "~")) or "/" in value or "\\" in value
+
+
+def artifact_key(dependencies, config, source_dir: Path):
+    """Key for the final artifacts, from the dependency key, the config and every staged source file"""
+    digest = hashlib.sha256()
+    for part in _environment():
+        digest.update(part.encode() + b"\0")
+    digest.update(f"dependencies={dependencies}".encode() + b"\0")
+    digest.update(json.dumps(config, sort_keys=True, default=str).encode() + b"\0")
+    for path, relative, is_dir in walk_entries(Path(source_dir)):
+        if is_dir:
+            continue
+        executable = bool(path.stat().st_mode & 0o111)
+        digest.update(f"{relative}\0{executable}\0".encode())
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+class RemoteCache:
+    """
+    Publishes and restores directories as a manifest plus content addressed, compressed blobs.
+
+    Blobs are uploaded and downloaded concurrently, and at most `workers` of them are held in memory.
+    The manifest is only written once every blob is in place, so a reader either sees a complete entry or none.
+    """
+
+    def __init__(
+        self,
+        backend,
+        workers=DEFAULT_WORKERS,
+        blob_size=DEFAULT_BLOB_SIZE,
+        staging_directory=None,
+    ):
+        self.backend = backend
+        self.workers = workers
+        self.blob_size = blob_size
+        self.staging_directory = staging_directory
+
+    def publish(self, name, directory: Path, files=None):
+        try:
+            self._publish(name, Path(directory), files)
+        except Exception as e:
+            logging.warning(f"could not publish '{name}' to the remote cache: {e}")
+            return False
+        logging.info(f"published '{name}' to the remote cache")
+        return True
+
+    def restore(self, name, directory: Path):
+        try:
+            manifest = self.backend.get(f"manifests/{name}.json")
+            if manifest is None:
+                logging.info(f"'{name}' was not found in the remote cache")
+                return False
+            self._restore(json.loads(manifest), Path(directory))
+        except Exception as e:
+            logging.warning(f"could not restore '{name}' from the remote cache: {e}")
+            return False
+        logging.info(f"restored '{name}' from the remote cache")
+        return True
+
+    def _publish(self, name, directory: Path, files):
+        if files is None:
+            files = [
+                relative
+                for _path, relative, is_dir in walk_entries(directory)
+                if not is_dir
+            ]
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            writer = _BlobWriter(self, executor)
+            with tarfile.open(fileobj=writer, mode="w|") as tar:
+                for file in files:
+                    tar.add(directory.joinpath(file), arcname=file, recursive=False)
+            writer.flush()
+            blobs = [future.result() for future in writer.futures]
+
+        manifest = {"version": CACHE_VERSION, "blobs": blobs}
+        self.backend.put(f"manifests/{name}.json", json.dumps(manifest).encode())
+
+    def _upload(self, data):
+        compressed = zlib.compress(data)
+        digest = hashlib.sha256(compressed).hexdigest()
+        self.backend.put(f"blobs/{digest}", compressed)
+        return {"sha256": digest, "size": len(data)}
+
+    def _download(self, blob):
+        compressed = self.backend.get(f"blobs/{blob['sha256']}")
+        if compressed is None:
+            raise CorruptCacheEntry(f"blob {blob['sha256']} is missing")
+        if hashlib.sha256(compressed).hexdigest() != blob["sha256"]:
+            raise CorruptCacheEntry(f"blob {blob['sha256']} does not match its hash")
+
+        data = zlib.decompress(compressed)
+        if len(data) != blob["size"]:
+            raise CorruptCacheEntry(f"blob {blob['sha256']} has the wrong size")
+        return data
+
+    def _blobs(self, manifest, executor):
+        pending = deque()
+        for blob in manifest["blobs"]:
+            pending.append(executor.submit(self._download, blob))
+            if len(pending) >= self.workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def _restore(self, manifest, directory: Path):
+        if manifest.get("version") != CACHE_VERSION:
+            raise CorruptCacheEntry(
+                f"unsupported cache version {manifest.get('version')}"
+            )
+
+        # extract to a temporary directory first so a failed download leaves nothing behind
+        with tempfile.TemporaryDirectory(dir=self.staging_directory) as tmp:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                reader = _BlobReader(self._blobs(manifest, executor))
+                with tarfile.open(fileobj=reader, mode="r|") as tar:
+                    if hasattr(tarfile, "data_filter"):
+                        tar.extractall(tmp, filter="data")
+                    else:
+                        tar.extractall(tmp)
+
+            directory.mkdir(parents=True, exist_ok=True)
+            link_tree(Path(tmp), directory)
+
+
+class _BlobWriter:
+    def __init__(self, cache, executor):
+        self.cache = cache
+        self.executor = executor
+        self.buffer = bytearray()
+        self.futures = []
+        self.in_flight = threading.BoundedSemaphore(cache.workers)
+
+    def write(self, data):
+        self.buffer += data
+        while len(self.buffer) >= self.cache.blob_size:
+            self._submit(bytes(self.buffer[: self.cache.blob_size]))
+            del self.buffer[: self.cache.blob_size]
+        return len(data)
+
+    def flush(self):
+        if self.buffer:
+            self._submit(bytes(self.buffer))
+            self.buffer = bytearray()
+
+    def _submit(self, data):
+        self.in_flight.acquire()
+        future = self.executor.submit(self.cache._upload, data)
+        future.add_done_callback(lambda _: self.in_flight.release())
+        self.futures.append(future)
+
+
+class _BlobReader:
+    def __init__(self, blobs):
+        self.blobs = blobs
+        self.current = b""
+        self.offset = 0
+
+    def read(self, size=-1):
+        chunks = []
+        while size != 0:
+            if self.offset >= len(self.current):
+                self.current = next(self.blobs, b"")
+                self.offset = 0
+                if not self.current:
+                    break
+
+            end = len(self.current)
+            if size > 0:
+                end = min(end, self.offset + size)
+                size -= end - self.offset
+            chunks.append(self.current[self.offset : end])
+            self.offset = end
+        return b"".join(chunks)
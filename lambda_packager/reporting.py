@@ -0,0 +1,113 @@
+import json
+import logging
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+TEXT = "text"
+JSON = "json"
+LOG_FORMATS = [TEXT, JSON]
+
+DEFAULT_REFRESH_INTERVAL = 0.1
+
+
+class JsonLogFormatter(logging.Formatter):
+    """One json object per line, for CI systems that parse build logs"""
+
+    def format(self, record):
+        entry = {
+            "time": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "location": f"{record.filename}:{record.lineno}",
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+
+class Stage:
+    """Counters for one stage of a build, e.g. how many files were copied and skipped"""
+
+    def __init__(self, name, progress_bar=None):
+        self.name = name
+        self.counts = Counter()
+        self.progress_bar = progress_bar
+        self.start = time.perf_counter()
+        self.seconds = None
+
+    def add(self, counter, n=1):
+        self.counts[counter] += n
+        if self.progress_bar:
+            self.progress_bar.update(self)
+
+    def describe(self):
+        counts = ", ".join(
+            f"{count} {counter}" for counter, count in sorted(self.counts.items())
+        )
+        return f"{self.name}: {counts or 'nothing to do'}"
+
+
+class ProgressBar:
+    """
+    Redraws a single status line on a terminal, at most once every `interval` seconds.
+
+    It is also a logging filter, so adding it to the handler writing to the same
+    terminal clears the status line before each log record is printed.
+    """
+
+    def __init__(self, stream, interval=DEFAULT_REFRESH_INTERVAL):
+        self.stream = stream
+        self.interval = interval
+        self.last_drawn = None
+        self.visible = False
+
+    def update(self, stage):
+        now = time.monotonic()
+        if self.last_drawn is not None and now - self.last_drawn < self.interval:
+            return
+        self.last_drawn = now
+        self.stream.write(f"\r\x1b[K{stage.describe()}")
+        self.stream.flush()
+        self.visible = True
+
+    def clear(self):
+        if self.visible:
+            self.stream.write("\r\x1b[K")
+            self.stream.flush()
+            self.visible = False
+
+    def filter(self, record):
+        self.clear()
+        return True
+
+
+class Reporter:
+    """Collects per stage counters and logs one summary line per stage"""
+
+    def __init__(self, logger=None, progress_bar=None):
+        self.logger = logger or logging.getLogger(__name__)
+        self.progress_bar = progress_bar
+        self.stages = []
+
+    @classmethod
+    def for_stream(cls, logger, stream=sys.stderr, log_format=TEXT):
+        """Only draw a progress bar on an interactive terminal that is showing info logs"""
+        progress_bar = None
+        if log_format == TEXT and stream.isatty() and logger.isEnabledFor(logging.INFO):
+            progress_bar = ProgressBar(stream)
+        return cls(logger, progress_bar)
+
+    @contextmanager
+    def stage(self, name):
+        stage = Stage(name, self.progress_bar)
+        try:
+            yield stage
+        finally:
+            if self.progress_bar:
+                self.progress_bar.clear()
+        stage.seconds = time.perf_counter() - stage.start
+        self.stages.append(stage)
+        self.logger.info("%s in %.2fs", stage.describe(), stage.seconds)
@@ -0,0 +1,158 @@
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from importlib.machinery import EXTENSION_SUFFIXES
+from pathlib import Path
+
+IMPORT_REPORT = "import-report.json"
+
+SKIPPED_DIRECTORIES = {"__pycache__", "bin"}
+METADATA_SUFFIXES = (".dist-info", ".egg-info", ".data")
+
+# -I keeps the child away from the user's site-packages and current directory,
+# and -S from the interpreter's own site-packages, such as the project's venv,
+# so only the staged tree (and the standard library) can satisfy the import.
+# The time goes to its own file, as the module is free to write anything to stdout
+_IMPORT_MODULE = """
+import importlib
+import sys
+import time
+
+sys.path.insert(0, sys.argv[1])
+start = time.perf_counter()
+importlib.import_module(sys.argv[2])
+seconds = time.perf_counter() - start
+with open(sys.argv[3], "w") as f:
+    f.write(repr(seconds))
+"""
+
+
+class ImportVerificationFailed(Exception):
+    pass
+
+
+class ImportResult:
+    def __init__(self, module, seconds=None, error=None):
+        self.module = module
+        self.seconds = seconds
+        self.error = error
+
+    def to_report(self):
+        return {"module": self.module, "seconds": self.seconds, "error": self.error}
+
+
+def find_top_level_modules(staging_dir: Path):
+    modules = set()
+    for entry in Path(staging_dir).iterdir():
+        name = entry.name
+        if entry.is_dir():
+            if name in SKIPPED_DIRECTORIES or name.endswith(METADATA_SUFFIXES):
+                continue
+            module = name
+        elif name.endswith(".py"):
+            module = name[: -len(".py")]
+        elif name.endswith(tuple(EXTENSION_SUFFIXES)):
+            module = name.split(".")[0]
+        else:
+            continue
+
+        if module.isidentifier():
+            modules.add(module)
+    return sorted(modules)
+
+
+def import_module(staging_dir: Path, module, timeout, python=sys.executable):
+    fd, timing_path = tempfile.mkstemp(suffix=".seconds")
+    os.close(fd)
+    try:
+        cmd = [
+            python,
+            "-I",
+            "-S",
+            "-c",
+            _IMPORT_MODULE,
+            str(staging_dir),
+            module,
+            timing_path,
+        ]
+        try:
+            completed = subprocess.run(cmd, capture_output=True, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            return ImportResult(module, error=f"timed out after {timeout}s")
+
+        if completed.returncode != 0:
+            stderr = completed.stderr.decode(errors="replace").strip().splitlines()
+            return ImportResult(module, error=stderr[-1] if stderr else "import failed")
+
+        try:
+            seconds = float(Path(timing_path).read_text())
+        except ValueError:
+            # e.g. the module exited the interpreter while it was being imported
+            return ImportResult(module, error="the import did not finish")
+        return ImportResult(module, seconds=seconds)
+    finally:
+        os.unlink(timing_path)
+
+
+def verify_imports(
+    staging_dir: Path,
+    report_path: Path,
+    workers=None,
+    timeout=30,
+    python=None,
+    ignore=None,
+):
+    """Import every top level module of the staged tree in its own interpreter, in parallel"""
+    if ignore is None:
+        ignore = []
+    if python is None:
+        python = sys.executable
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    modules = [
+        module for module in find_top_level_modules(staging_dir) if module not in ignore
+    ]
+    logging.info(f"verifying imports of {len(modules)} modules with {workers} workers")
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(
+            executor.map(
+                lambda module: import_module(staging_dir, module, timeout, python),
+                modules,
+            )
+        )
+
+    succeeded = sorted(
+        (result for result in results if result.error is None),
+        key=lambda result: result.seconds,
+        reverse=True,
+    )
+    failed = [result for result in results if result.error is not None]
+
+    report_path = Path(report_path)
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    report_path.write_text(
+        json.dumps(
+            {
+                "python": python,
+                "failed": [result.to_report() for result in failed],
+                "imports": [result.to_report() for result in succeeded],
+            },
+            indent=2,
+        )
+    )
+
+    for result in succeeded[:5]:
+        logging.info(f"importing {result.module} took {result.seconds:.3f}s")
+
+    if failed:
+        failures = "\n".join(f"{result.module}: {result.error}" for result in failed)
+        raise ImportVerificationFailed(
+            f"{len(failed)} modules failed to import, see '{report_path}':\n{failures}"
+        )
+    return succeeded
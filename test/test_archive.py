@@ -0,0 +1,126 @@
+import os
+import tracemalloc
+import zipfile
+
+import pytest
+
+from lambda_packager.archive import (
+    CompressionPolicy,
+    UnsupportedCompression,
+    create_zip,
+)
+from lambda_packager.package import LambdaAutoPackage
+
+
+def test_already_compressed_files_are_stored_by_default():
+    test_path = LambdaAutoPackage._create_tmp_directory()
+    wheel = test_path.joinpath("a.whl")
+    wheel.write_text("a" * 1000)
+
+    policy = CompressionPolicy()
+    assert policy.compression_for(wheel, "a.whl") == (zipfile.ZIP_STORED, None)
+
+
+def test_compression_overrides_match_globs():
+    test_path = LambdaAutoPackage._create_tmp_directory()
+    file = test_path.joinpath("model.bin")
+    file.write_text("a" * 1000)
+
+    policy = CompressionPolicy(
+        level=3, overrides={"*.bin": 9, "*.so": "store", "*.txt": "deflate"}
+    )
+    assert policy.compression_for(file, "pkg/model.bin") == (zipfile.ZIP_DEFLATED, 9)
+    assert policy.compression_for(file, "pkg/lib.so") == (zipfile.ZIP_STORED, None)
+    assert policy.compression_for(file, "a.txt") == (zipfile.ZIP_DEFLATED, 3)
+    assert policy.compression_for(file, "a.py") == (zipfile.ZIP_DEFLATED, 3)
+
+
+def test_user_overrides_beat_default_store_patterns():
+    test_path = LambdaAutoPackage._create_tmp_directory()
+    file = test_path.joinpath("a.png")
+    file.write_text("a" * 1000)
+
+    policy = CompressionPolicy(overrides={"*.png": 1})
+    assert policy.compression_for(file, "a.png") == (zipfile.ZIP_DEFLATED, 1)
+
+
+def test_incompressible_files_are_stored_after_trial():
+    test_path = LambdaAutoPackage._create_tmp_directory()
+    random_file = test_path.joinpath("random.dat")
+    random_file.write_bytes(os.urandom(10000))
+
+    assert CompressionPolicy().compression_for(random_file, "random.dat") == (
+        zipfile.ZIP_STORED,
+        None,
+    )
+    assert CompressionPolicy(store_threshold=1).compression_for(
+        random_file, "random.dat"
+    ) == (zipfile.ZIP_DEFLATED, 6)
+
+
+@pytest.mark.parametrize("value", ["bzip2", "lzma"])
+def test_compression_lambda_cannot_read_is_rejected(value):
+    with pytest.raises(UnsupportedCompression, match="cannot be read by AWS Lambda"):
+        CompressionPolicy(overrides={"*": value})
+
+
+@pytest.mark.parametrize("value", [10, -1, "fast", True])
+def test_invalid_compression_level_is_rejected(value):
+    with pytest.raises(ValueError, match="is not valid"):
+        CompressionPolicy(overrides={"*": value})
+
+
+def test_create_zip_applies_policy():
+    source_dir = LambdaAutoPackage._create_tmp_directory()
+    source_dir.joinpath("handler.py").write_text("print('hello')\n" * 100)
+    source_dir.joinpath("lib").mkdir()
+    source_dir.joinpath("lib/random.so").write_bytes(os.urandom(10000))
+
+    target = LambdaAutoPackage._create_tmp_directory().joinpath("lambda.zip")
+    create_zip(source_dir, target)
+
+    with zipfile.ZipFile(target) as zf:
+        assert zf.namelist() == ["handler.py", "lib/", "lib/random.so"]
+        assert zf.getinfo("handler.py").compress_type == zipfile.ZIP_DEFLATED
+        assert zf.getinfo("lib/random.so").compress_type == zipfile.ZIP_STORED
+        assert (
+            zf.read("lib/random.so")
+            == source_dir.joinpath("lib/random.so").read_bytes()
+        )
+
+
+def test_create_zip_skips_target_inside_source():
+    source_dir = LambdaAutoPackage._create_tmp_directory()
+    source_dir.joinpath("handler.py").write_text("handler")
+    target = source_dir.joinpath("lambda.zip")
+
+    create_zip(source_dir, target)
+
+    with zipfile.ZipFile(target) as zf:
+        assert zf.namelist() == ["handler.py"]
+
+
+def test_create_zip_memory_does_not_grow_with_file_size():
+    source_dir = LambdaAutoPackage._create_tmp_directory()
+    large_file = source_dir.joinpath("large.bin")
+    with open(large_file, "wb") as f:
+        for _ in range(32):
+            f.write(os.urandom(1024 * 1024))
+
+    target = LambdaAutoPackage._create_tmp_directory().joinpath("lambda.zip")
+    tracemalloc.start()
+    try:
+        create_zip(
+            source_dir,
+            target,
+            compression_policy=CompressionPolicy(store_threshold=1),
+        )
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    # the trial compression sample plus the 8KiB blocks ZipFile.write streams with
+    assert peak < 512 * 1024
+    with zipfile.ZipFile(target) as zf:
+        assert zf.getinfo("large.bin").file_size == 32 * 1024 * 1024
+        assert zf.testzip() is None
@@ -1,4 +1,9 @@
-from lambda_packager import parse_args
+import logging
+import subprocess
+import sys
+
+from lambda_packager import parse_args, run_cli
+from lambda_packager.package import LambdaAutoPackage
 
 
 def test_cli_no_args():
@@ -6,6 +11,8 @@ def test_cli_no_args():
     assert parsed
     assert parsed.project_directory is None
     assert parsed.log_level == "INFO"
+    assert parsed.installer is None
+    assert parsed.log_format == "text"
 
 
 def test_cli_with_optional_args():
@@ -19,3 +26,62 @@ def test_cli_with_long_args():
     assert parsed
     assert parsed.project_directory == "test"
     assert parsed.log_level == "WARNING"
+
+
+def test_cli_with_installer():
+    parsed = parse_args(["--installer", "uv"])
+    assert parsed
+    assert parsed.installer == "uv"
+
+
+def test_cli_with_daemon_socket():
+    parsed = parse_args(["--daemon-socket", "/tmp/lambda-packager.sock"])
+    assert parsed
+    assert parsed.daemon_socket == "/tmp/lambda-packager.sock"
+
+
+def test_cli_with_json_log_format():
+    parsed = parse_args(["--log-format", "json"])
+    assert parsed
+    assert parsed.log_format == "json"
+
+
+def test_cli_removes_temporary_directories(monkeypatch):
+    test_path = LambdaAutoPackage._create_tmp_directory()
+    test_path.joinpath("test_file_1.py").write_text("test file 1")
+
+    created = []
+    create_tmp_directory = LambdaAutoPackage._create_tmp_directory
+
+    def record_tmp_directory(parent=None):
+        created.append(create_tmp_directory(parent))
+        return created[-1]
+
+    monkeypatch.setattr(
+        LambdaAutoPackage, "_create_tmp_directory", staticmethod(record_tmp_directory)
+    )
+    monkeypatch.setattr(
+        sys, "argv", ["lambda-packager", "--project-directory", str(test_path)]
+    )
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    try:
+        run_cli()
+    finally:
+        root.handlers = handlers
+        root.setLevel(level)
+
+    assert test_path.joinpath("dist/lambda.zip").is_file()
+    assert created
+    assert not any(directory.exists() for directory in created)
+
+
+def test_cli_module_does_not_import_packaging_code():
+    # a fresh interpreter, as this one has already imported everything
+    code = "import sys, lambda_packager;" "print(' '.join(sorted(sys.modules)))"
+    modules = subprocess.check_output([sys.executable, "-c", code]).decode().split()
+
+    assert "lambda_packager.daemon_client" in modules
+    assert "lambda_packager.package" not in modules
+    assert "lambda_packager.remote_cache" not in modules
+    assert "tomli" not in modules
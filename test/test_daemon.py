@@ -0,0 +1,189 @@
+import logging
+import os
+import threading
+import zipfile
+
+import pytest
+
+from lambda_packager.build_state import BuildState
+from lambda_packager.config import Config
+from lambda_packager.daemon import BuildServer
+from lambda_packager.daemon_client import RemoteBuildFailed, run_remote
+from lambda_packager.package import LambdaAutoPackage
+import test_file_helpers
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+@pytest.fixture
+def daemon():
+    socket_path = LambdaAutoPackage._create_tmp_directory().joinpath("daemon.sock")
+    state = BuildState(LambdaAutoPackage._create_tmp_directory())
+    server = BuildServer(socket_path, state)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield socket_path
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client_logger():
+    # replayed records must not reach the root logger, which the daemon streams from
+    logger = logging.getLogger("test_daemon_client")
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    handler = ListHandler()
+    logger.addHandler(handler)
+    yield logger, handler
+    logger.removeHandler(handler)
+
+
+def build(socket_path, project_directory, logger):
+    options = {
+        "project_directory": str(project_directory),
+        "log_level": "INFO",
+        "installer": None,
+    }
+    run_remote(socket_path, options, logger)
+
+
+def test_cached_value_is_recomputed_when_file_changes():
+    test_path = LambdaAutoPackage._create_tmp_directory()
+    file = test_path.joinpath("pyproject.toml")
+    file.write_text("first")
+    state = BuildState(LambdaAutoPackage._create_tmp_directory())
+
+    assert state.cached(("read",), [file], file.read_text) == "first"
+    file.write_text("second!")
+    os.utime(file, ns=(0, 0))
+    assert state.cached(("read",), [file], file.read_text) == "second!"
+    assert state.cached(("read",), [file], lambda: "not recomputed") == "second!"
+
+
+def test_warm_file_walk_only_stats_directories(monkeypatch):
+    test_path = LambdaAutoPackage._create_tmp_directory()
+    test_path.joinpath("src").mkdir()
+    test_path.joinpath("src/handler.py").write_text("handler")
+    test_path.joinpath(".git").mkdir()
+    test_path.joinpath("venv").mkdir()
+    config = Config(ignore_folders=["venv"])
+
+    walks = []
+    get_matching = LambdaAutoPackage._get_matching_files_and_folders
+
+    def count_walks(pattern_list, source_dir, pruned=None):
+        walks.append(source_dir)
+        return get_matching(pattern_list, source_dir, pruned)
+
+    monkeypatch.setattr(
+        LambdaAutoPackage,
+        "_get_matching_files_and_folders",
+        staticmethod(count_walks),
+    )
+    state = BuildState(LambdaAutoPackage._create_tmp_directory())
+    package = LambdaAutoPackage(config=config, state=state)
+    package._matching_files_and_folders(test_path)
+    (walked, _, _) = next(iter(state._walks.values()))
+    assert sorted(walked) == [str(test_path), str(test_path.joinpath("src"))]
+
+    # changes in hidden and ignored folders do not invalidate the walk
+    test_path.joinpath(".git/index").write_text("index")
+    test_path.joinpath("venv/lib.py").write_text("lib")
+    package._matching_files_and_folders(test_path)
+    assert len(walks) == 1
+
+    test_path.joinpath("src/new.py").write_text("new")
+    os.utime(test_path.joinpath("src"), ns=(0, 0))
+    matches = package._matching_files_and_folders(test_path)
+    assert len(walks) == 2
+    assert test_path.joinpath("src/new.py") in matches
+
+
+def test_least_recently_used_dependencies_are_evicted():
+    state = BuildState(LambdaAutoPackage._create_tmp_directory(), max_dependencies=2)
+    for key in ["a", "b", "c"]:
+        installed = LambdaAutoPackage._create_tmp_directory()
+        installed.joinpath(f"{key}.py").write_text(key)
+        state.save_dependencies(key, installed)
+        if key == "b":
+            assert state.restore_dependencies(
+                "a", LambdaAutoPackage._create_tmp_directory()
+            )
+
+    target = LambdaAutoPackage._create_tmp_directory()
+    assert not state.restore_dependencies("b", target)
+    assert state.restore_dependencies("a", target)
+    assert state.restore_dependencies("c", target)
+    assert len(list(state.directory.iterdir())) == 2
+
+
+def test_dependencies_are_kept_under_the_given_parent():
+    state = BuildState(LambdaAutoPackage._create_tmp_directory())
+    staging = LambdaAutoPackage._create_tmp_directory()
+    installed = LambdaAutoPackage._create_tmp_directory()
+    installed.joinpath("a.py").write_text("a")
+
+    state.save_dependencies("a", installed, parent=staging)
+
+    assert [path.name for path in staging.iterdir()] == [
+        path.name for path in state._dependencies.values()
+    ]
+    assert list(state.directory.iterdir()) == []
+    state.clear()
+    assert list(staging.iterdir()) == []
+
+
+def test_daemon_builds_and_reuses_dependencies(daemon, client_logger):
+    logger, handler = client_logger
+    config = "test/resources/test_config.toml"
+
+    first = LambdaAutoPackage._create_tmp_directory()
+    test_file_helpers.with_requirements_file(first)
+    test_file_helpers.with_config_file(first, config)
+    first.joinpath("test_file_1").write_text("test file 1")
+    build(daemon, first, logger)
+
+    assert "using requirements.txt file in project directory" in handler.messages
+    assert first.joinpath("dist/lambda.zip").is_file()
+
+    second = LambdaAutoPackage._create_tmp_directory()
+    test_file_helpers.with_requirements_file(second)
+    test_file_helpers.with_config_file(second, config)
+    second.joinpath("test_file_2").write_text("test file 2")
+    build(daemon, second, logger)
+
+    assert "using dependencies installed by a previous build" in handler.messages
+    zip = zipfile.ZipFile(second.joinpath("dist/lambda.zip"))
+    assert "pip_install_test/__init__.py" in zip.namelist()
+    assert "test_file_2" in zip.namelist()
+    assert "test_file_1" not in zip.namelist()
+
+
+def test_daemon_reports_failed_builds(daemon, client_logger):
+    logger, _ = client_logger
+    test_path = LambdaAutoPackage._create_tmp_directory()
+
+    with pytest.raises(RemoteBuildFailed, match="No src files were found"):
+        build(daemon, test_path, logger)
+
+
+def test_daemon_picks_up_new_source_files(daemon, client_logger):
+    logger, _ = client_logger
+    test_path = LambdaAutoPackage._create_tmp_directory()
+    test_path.joinpath("test_file_1.py").write_text("test file 1")
+    build(daemon, test_path, logger)
+
+    test_path.joinpath("test_file_2.py").write_text("test file 2")
+    os.utime(test_path, ns=(0, 0))
+    build(daemon, test_path, logger)
+
+    zip = zipfile.ZipFile(test_path.joinpath("dist/lambda.zip"))
+    assert sorted(zip.namelist()) == ["test_file_1.py", "test_file_2.py"]
@@ -0,0 +1,118 @@
+import logging
+import shutil
+import subprocess
+
+import pytest
+
+from lambda_packager.handle_requirements_txt import (
+    _pip_command,
+    _uv_platform,
+    install_requirements_txt,
+)
+from lambda_packager.package import LambdaAutoPackage
+import test_file_helpers
+
+
+@pytest.mark.parametrize(
+    "installer",
+    [
+        "pip",
+        "wheel",
+        pytest.param(
+            "uv",
+            marks=pytest.mark.skipif(
+                shutil.which("uv") is None, reason="uv is not installed"
+            ),
+        ),
+    ],
+)
+def test_requirements_txt_is_installed_with_each_installer(installer):
+    test_path = LambdaAutoPackage._create_tmp_directory()
+    requirements = test_file_helpers.with_requirements_file(test_path)
+    target = test_path.joinpath("dist")
+
+    install_requirements_txt(
+        requirements_file_path=requirements,
+        target=str(target),
+        installer=installer,
+    )
+
+    assert target.joinpath("pip_install_test/__init__.py").is_file()
+
+
+def test_uv_falls_back_to_pip_when_not_installed(monkeypatch, caplog):
+    monkeypatch.setattr(shutil, "which", lambda _: None)
+    test_path = LambdaAutoPackage._create_tmp_directory()
+    requirements = test_file_helpers.with_requirements_file(test_path)
+    target = test_path.joinpath("dist")
+
+    with caplog.at_level(logging.INFO):
+        install_requirements_txt(
+            requirements_file_path=requirements,
+            target=str(target),
+            installer="uv",
+        )
+
+    assert "uv could not be found in your path, falling back to pip" in caplog.text
+    assert "installing pip requirements" in caplog.text
+    assert target.joinpath("pip_install_test/__init__.py").is_file()
+
+
+def test_unknown_installer_is_rejected():
+    test_path = LambdaAutoPackage._create_tmp_directory()
+    requirements = test_file_helpers.with_requirements_file(test_path)
+
+    with pytest.raises(ValueError, match="installer 'conda' is not valid"):
+        install_requirements_txt(
+            requirements_file_path=requirements,
+            target=str(test_path.joinpath("dist")),
+            installer="conda",
+        )
+
+
+def test_pip_command_with_platform():
+    cmd = _pip_command("target", "requirements.txt", True, "manylinux2014_x86_64")
+
+    assert cmd[-4:] == [
+        "--no-deps",
+        "--platform",
+        "manylinux2014_x86_64",
+        "--only-binary=:all:",
+    ]
+
+
+@pytest.mark.parametrize(
+    "platform, expected",
+    [
+        ("manylinux2014_x86_64", "x86_64-manylinux2014"),
+        ("manylinux_2_28_aarch64", "aarch64-manylinux_2_28"),
+        ("linux", "linux"),
+    ],
+)
+def test_uv_platform(platform, expected):
+    assert _uv_platform(platform) == expected
+
+
+def test_wheel_falls_back_to_pip_when_a_wheel_is_missing(monkeypatch, caplog):
+    test_path = LambdaAutoPackage._create_tmp_directory()
+    requirements = test_file_helpers.with_requirements_file(test_path)
+    target = test_path.joinpath("dist")
+    check_output = subprocess.check_output
+    commands = []
+
+    def no_wheels(cmd):
+        commands.append(cmd)
+        if "download" in cmd:
+            raise subprocess.CalledProcessError(1, cmd)
+        return check_output(cmd)
+
+    monkeypatch.setattr(subprocess, "check_output", no_wheels)
+    install_requirements_txt(
+        requirements_file_path=requirements,
+        target=str(target),
+        installer="wheel",
+    )
+
+    assert "falling back to pip" in caplog.text
+    assert "install" in commands[-1]
+    assert target.joinpath("pip_install_test/__init__.py").is_file()
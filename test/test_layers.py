@@ -0,0 +1,177 @@
+import json
+import os
+import zipfile
+
+import pytest
+
+from lambda_packager.config import Config
+from lambda_packager.layers import (
+    PackageTooLarge,
+    find_distributions,
+    plan_layout,
+    write_split_package,
+)
+from lambda_packager.package import LambdaAutoPackage
+
+
+def with_distribution(staging_dir, name, size, compressible=False):
+    package = staging_dir.joinpath(name)
+    package.mkdir()
+    content = b"#" * size if compressible else os.urandom(size)
+    package.joinpath("__init__.py").write_bytes(content)
+
+    dist_info = staging_dir.joinpath(f"{name}-1.0.dist-info")
+    dist_info.mkdir()
+    dist_info.joinpath("METADATA").write_text(f"Name: {name}")
+    dist_info.joinpath("RECORD").write_text(
+        f"{name}/__init__.py,,\n"
+        f"{name}-1.0.dist-info/METADATA,,\n"
+        f"{name}-1.0.dist-info/RECORD,,\n"
+        f"../../bin/{name}-cli,,\n"
+    )
+
+
+def test_find_distributions_groups_files_by_record():
+    staging_dir = LambdaAutoPackage._create_tmp_directory()
+    with_distribution(staging_dir, "small", 10)
+    staging_dir.joinpath("handler.py").write_text("handler")
+
+    (distribution,) = find_distributions(staging_dir)
+
+    assert distribution.name == "small-1.0"
+    assert [file.as_posix() for file in distribution.files] == [
+        "small/__init__.py",
+        "small-1.0.dist-info/METADATA",
+        "small-1.0.dist-info/RECORD",
+    ]
+    assert distribution.size > 10
+
+
+def test_plan_layout_does_not_split_when_package_fits():
+    staging_dir = LambdaAutoPackage._create_tmp_directory()
+    with_distribution(staging_dir, "small", 10)
+    staging_dir.joinpath("handler.py").write_text("handler")
+
+    function, layers = plan_layout(staging_dir, max_layers=2, layer_size_limit=1000)
+
+    assert layers == []
+    assert function.distributions == ["small-1.0"]
+
+
+def test_plan_layout_bin_packs_largest_first():
+    staging_dir = LambdaAutoPackage._create_tmp_directory()
+    with_distribution(staging_dir, "big", 600)
+    with_distribution(staging_dir, "medium", 400)
+    with_distribution(staging_dir, "small", 100)
+    staging_dir.joinpath("handler.py").write_text("handler")
+
+    function, layers = plan_layout(staging_dir, max_layers=2, layer_size_limit=1000)
+
+    assert [layer.distributions for layer in layers] == [
+        ["big-1.0", "small-1.0"],
+        ["medium-1.0"],
+    ]
+    assert function.distributions == []
+    assert [file.as_posix() for file in function.files] == ["handler.py"]
+    assert all(layer.size <= 1000 for layer in layers)
+
+
+def test_plan_layout_leaves_what_does_not_fit_in_layers_in_the_function():
+    staging_dir = LambdaAutoPackage._create_tmp_directory()
+    with_distribution(staging_dir, "big", 600)
+    with_distribution(staging_dir, "other", 700)
+    with_distribution(staging_dir, "huge", 2000)
+    staging_dir.joinpath("handler.py").write_bytes(os.urandom(1500))
+
+    function, layers = plan_layout(staging_dir, max_layers=1, layer_size_limit=1000)
+
+    assert [layer.distributions for layer in layers] == [["other-1.0"]]
+    assert function.distributions == ["huge-1.0", "big-1.0"]
+    assert function.size > 1000
+
+
+def test_plan_layout_fails_over_lambda_unzipped_limit(monkeypatch):
+    monkeypatch.setattr("lambda_packager.layers.MAX_UNZIPPED_SIZE", 1000)
+    staging_dir = LambdaAutoPackage._create_tmp_directory()
+    with_distribution(staging_dir, "big", 1200)
+
+    with pytest.raises(PackageTooLarge, match="over the lambda limit"):
+        plan_layout(staging_dir, max_layers=1, layer_size_limit=500)
+
+
+@pytest.mark.parametrize("max_layers", [0, 6])
+def test_plan_layout_rejects_invalid_layer_count(max_layers):
+    staging_dir = LambdaAutoPackage._create_tmp_directory()
+
+    with pytest.raises(ValueError, match="max_layers"):
+        plan_layout(staging_dir, max_layers=max_layers, layer_size_limit=1000)
+
+
+def test_write_split_package_writes_layers_and_manifest():
+    staging_dir = LambdaAutoPackage._create_tmp_directory()
+    with_distribution(staging_dir, "big", 700)
+    with_distribution(staging_dir, "medium", 600)
+    staging_dir.joinpath("handler.py").write_text("handler")
+    dist_dir = LambdaAutoPackage._create_tmp_directory()
+    dist_dir.joinpath("layer-3.zip").write_text("stale")
+
+    write_split_package(staging_dir, dist_dir, max_layers=2, layer_size_limit=1000)
+
+    manifest = json.loads(dist_dir.joinpath("lambda-layout.json").read_text())
+    assert manifest["function"]["zip"] == "lambda.zip"
+    assert [layer["zip"] for layer in manifest["layers"]] == [
+        "layer-1.zip",
+        "layer-2.zip",
+    ]
+    assert not dist_dir.joinpath("layer-3.zip").exists()
+
+    with zipfile.ZipFile(dist_dir.joinpath("lambda.zip")) as zf:
+        assert zf.namelist() == ["handler.py"]
+    with zipfile.ZipFile(dist_dir.joinpath("layer-1.zip")) as zf:
+        assert "python/big/__init__.py" in zf.namelist()
+
+
+def test_write_split_package_does_not_split_when_zip_fits():
+    staging_dir = LambdaAutoPackage._create_tmp_directory()
+    with_distribution(staging_dir, "big", 3000, compressible=True)
+    staging_dir.joinpath("handler.py").write_text("handler")
+    dist_dir = LambdaAutoPackage._create_tmp_directory()
+
+    manifest = write_split_package(
+        staging_dir, dist_dir, max_layers=2, layer_size_limit=1000
+    )
+
+    assert manifest["layers"] == []
+    assert manifest["function"]["unzipped_size"] > 3000
+    assert manifest["function"]["zipped_size"] <= 1000
+    with zipfile.ZipFile(dist_dir.joinpath("lambda.zip")) as zf:
+        assert "big/__init__.py" in zf.namelist()
+        assert "handler.py" in zf.namelist()
+
+
+def test_build_lambda_without_max_layers_removes_stale_layout():
+    test_path = LambdaAutoPackage._create_tmp_directory()
+    test_path.joinpath("test_file_1.py").write_text("test file 1")
+    test_path.joinpath("dist").mkdir()
+    test_path.joinpath("dist/lambda-layout.json").write_text("{}")
+    test_path.joinpath("dist/layer-1.zip").write_text("stale")
+
+    LambdaAutoPackage(project_directory=test_path).execute()
+
+    assert not test_path.joinpath("dist/lambda-layout.json").exists()
+    assert not test_path.joinpath("dist/layer-1.zip").exists()
+    assert test_path.joinpath("dist/lambda.zip").is_file()
+
+
+def test_build_lambda_with_max_layers_writes_manifest():
+    test_path = LambdaAutoPackage._create_tmp_directory()
+    test_path.joinpath("test_file_1.py").write_text("test file 1")
+
+    LambdaAutoPackage(
+        config=Config(max_layers=2), project_directory=test_path
+    ).execute()
+
+    manifest = json.loads(test_path.joinpath("dist/lambda-layout.json").read_text())
+    assert manifest["layers"] == []
+    with zipfile.ZipFile(test_path.joinpath("dist/lambda.zip")) as zf:
+        assert zf.namelist() == ["test_file_1.py"]
@@ -0,0 +1,251 @@
+import gzip
+import hashlib
+import io
+import json
+import logging
+import tarfile
+
+import pytest
+
+from lambda_packager.config import Config
+from lambda_packager.oci_image import BaseImage, InvalidBaseImage, write_oci_image
+from lambda_packager.package import LambdaAutoPackage
+from test_layers import with_distribution
+
+
+def write_blob(layout_dir, data):
+    digest = hashlib.sha256(data).hexdigest()
+    layout_dir.joinpath("blobs/sha256").mkdir(parents=True, exist_ok=True)
+    layout_dir.joinpath(f"blobs/sha256/{digest}").write_bytes(data)
+    return f"sha256:{digest}", len(data)
+
+
+def with_base_image(architecture="amd64"):
+    """A one layer OCI image layout behind a multi platform index, like `skopeo copy --all` writes"""
+    layout_dir = LambdaAutoPackage._create_tmp_directory()
+    layer = io.BytesIO()
+    with tarfile.open(fileobj=layer, mode="w") as tar:
+        bootstrap = b"#!/bin/sh"
+        info = tarfile.TarInfo("lambda-entrypoint.sh")
+        info.size = len(bootstrap)
+        tar.addfile(info, io.BytesIO(bootstrap))
+    layer_digest, layer_size = write_blob(layout_dir, gzip.compress(layer.getvalue()))
+
+    config = {
+        "architecture": architecture,
+        "os": "linux",
+        "config": {
+            "Entrypoint": ["/lambda-entrypoint.sh"],
+            "Env": ["PATH=/usr/bin", "LAMBDA_TASK_ROOT=/var/task"],
+        },
+        "rootfs": {"type": "layers", "diff_ids": ["sha256:base"]},
+        "history": [{"created_by": "base"}],
+    }
+    config_digest, config_size = write_blob(layout_dir, json.dumps(config).encode())
+    manifest = {
+        "schemaVersion": 2,
+        "mediaType": "application/vnd.oci.image.manifest.v1+json",
+        "config": {
+            "mediaType": "application/vnd.oci.image.config.v1+json",
+            "digest": config_digest,
+            "size": config_size,
+        },
+        "layers": [
+            {
+                "mediaType": "application/vnd.oci.image.layer.v1.tar+gzip",
+                "digest": layer_digest,
+                "size": layer_size,
+            }
+        ],
+    }
+    manifest_digest, manifest_size = write_blob(
+        layout_dir, json.dumps(manifest).encode()
+    )
+    platforms = {
+        "mediaType": "application/vnd.oci.image.index.v1+json",
+        "schemaVersion": 2,
+        "manifests": [
+            {
+                "mediaType": "application/vnd.oci.image.manifest.v1+json",
+                "digest": manifest_digest,
+                "size": manifest_size,
+                "platform": {"architecture": architecture, "os": "linux"},
+            }
+        ],
+    }
+    platforms_digest, platforms_size = write_blob(
+        layout_dir, json.dumps(platforms).encode()
+    )
+    index = {
+        "schemaVersion": 2,
+        "manifests": [
+            {
+                "mediaType": "application/vnd.oci.image.index.v1+json",
+                "digest": platforms_digest,
+                "size": platforms_size,
+            }
+        ],
+    }
+    layout_dir.joinpath("index.json").write_text(json.dumps(index))
+    return layout_dir
+
+
+def read_image(image_path):
+    with tarfile.open(image_path) as image:
+        blobs = {
+            member.name: image.extractfile(member).read()
+            for member in image.getmembers()
+            if member.isfile()
+        }
+
+    index = json.loads(blobs["index.json"])
+    manifest_digest = index["manifests"][0]["digest"]
+    manifest = json.loads(blobs[f"blobs/sha256/{manifest_digest[7:]}"])
+    return blobs, manifest
+
+
+def layer_names(blobs, descriptor):
+    data = blobs[f"blobs/sha256/{descriptor['digest'][7:]}"]
+    assert f"sha256:{hashlib.sha256(data).hexdigest()}" == descriptor["digest"]
+
+    layer_path = LambdaAutoPackage._create_tmp_directory().joinpath("layer.tar.gz")
+    layer_path.write_bytes(data)
+    with tarfile.open(layer_path) as layer:
+        return [member.name for member in layer.getmembers() if member.isfile()]
+
+
+def test_write_oci_image_separates_dependencies_and_source():
+    staging_dir = LambdaAutoPackage._create_tmp_directory()
+    with_distribution(staging_dir, "dependency", 10)
+    staging_dir.joinpath("dependency/__pycache__").mkdir()
+    staging_dir.joinpath("dependency/__pycache__/x.pyc").write_text("pyc")
+    staging_dir.joinpath("handler.py").write_text("handler")
+    target = LambdaAutoPackage._create_tmp_directory().joinpath("image.tar")
+
+    write_oci_image(staging_dir, target)
+
+    blobs, manifest = read_image(target)
+    assert blobs["oci-layout"] == b'{"imageLayoutVersion":"1.0.0"}'
+
+    dependencies, source = manifest["layers"]
+    assert layer_names(blobs, dependencies) == [
+        "var/task/dependency/__init__.py",
+        "var/task/dependency-1.0.dist-info/METADATA",
+        "var/task/dependency-1.0.dist-info/RECORD",
+    ]
+    assert layer_names(blobs, source) == ["var/task/handler.py"]
+
+    config = json.loads(blobs[f"blobs/sha256/{manifest['config']['digest'][7:]}"])
+    assert "Cmd" not in config["config"]
+    assert config["config"]["WorkingDir"] == "/var/task"
+    assert len(config["rootfs"]["diff_ids"]) == 2
+
+
+def test_write_oci_image_on_base_image():
+    staging_dir = LambdaAutoPackage._create_tmp_directory()
+    with_distribution(staging_dir, "dependency", 10)
+    staging_dir.joinpath("handler.py").write_text("handler")
+    target = LambdaAutoPackage._create_tmp_directory().joinpath("image.tar")
+    base = BaseImage(with_base_image("arm64"), architecture="arm64")
+
+    write_oci_image(staging_dir, target, cmd=["handler.handle"], base=base)
+
+    blobs, manifest = read_image(target)
+    base_layer, dependencies, source = manifest["layers"]
+    assert base_layer == base.manifest["layers"][0]
+    assert layer_names(blobs, base_layer) == ["lambda-entrypoint.sh"]
+    assert layer_names(blobs, source) == ["var/task/handler.py"]
+
+    config = json.loads(blobs[f"blobs/sha256/{manifest['config']['digest'][7:]}"])
+    assert config["architecture"] == "arm64"
+    assert config["config"]["Entrypoint"] == ["/lambda-entrypoint.sh"]
+    assert config["config"]["Cmd"] == ["handler.handle"]
+    assert config["config"]["Env"] == ["PATH=/usr/bin", "LAMBDA_TASK_ROOT=/var/task"]
+    assert config["rootfs"]["diff_ids"][0] == "sha256:base"
+    assert len(config["rootfs"]["diff_ids"]) == 3
+    assert len(config["history"]) == 3
+
+
+def test_base_image_must_match_architecture():
+    with pytest.raises(InvalidBaseImage, match="has no linux/amd64 image"):
+        BaseImage(with_base_image("arm64"), architecture="amd64")
+
+    with pytest.raises(InvalidBaseImage, match="has no index.json"):
+        BaseImage(LambdaAutoPackage._create_tmp_directory())
+
+
+def test_image_cmd_needs_a_base_image():
+    staging_dir = LambdaAutoPackage._create_tmp_directory()
+    staging_dir.joinpath("handler.py").write_text("handler")
+    target = LambdaAutoPackage._create_tmp_directory().joinpath("image.tar")
+
+    with pytest.raises(ValueError, match="needs a base image"):
+        write_oci_image(staging_dir, target, cmd=["handler.handle"])
+
+
+def test_source_change_only_changes_source_layer():
+    staging_dir = LambdaAutoPackage._create_tmp_directory()
+    with_distribution(staging_dir, "dependency", 10)
+    handler = staging_dir.joinpath("handler.py")
+    handler.write_text("handler")
+    output_dir = LambdaAutoPackage._create_tmp_directory()
+
+    write_oci_image(staging_dir, output_dir.joinpath("first.tar"))
+    write_oci_image(staging_dir, output_dir.joinpath("second.tar"))
+    handler.write_text("changed handler")
+    write_oci_image(staging_dir, output_dir.joinpath("third.tar"))
+
+    _, first = read_image(output_dir.joinpath("first.tar"))
+    _, second = read_image(output_dir.joinpath("second.tar"))
+    _, third = read_image(output_dir.joinpath("third.tar"))
+
+    assert first == second
+    assert first["layers"][0] == third["layers"][0]
+    assert first["layers"][1] != third["layers"][1]
+
+
+def test_build_lambda_with_oci_output():
+    test_path = LambdaAutoPackage._create_tmp_directory()
+    test_path.joinpath("test_file_1.py").write_text("test file 1")
+
+    LambdaAutoPackage(
+        config=Config(output_format="oci"), project_directory=test_path
+    ).execute()
+
+    assert test_path.joinpath("dist/lambda-image.tar").is_file()
+    assert not test_path.joinpath("dist/lambda.zip").exists()
+
+
+def test_build_lambda_with_oci_output_on_base_image():
+    test_path = LambdaAutoPackage._create_tmp_directory()
+    test_path.joinpath("test_file_1.py").write_text("test file 1")
+    base = with_base_image()
+    config = Config(
+        output_format="oci", image_base=str(base), image_cmd=["test_file_1.handler"]
+    )
+
+    LambdaAutoPackage(config=config, project_directory=test_path).execute()
+
+    blobs, manifest = read_image(test_path.joinpath("dist/lambda-image.tar"))
+    assert len(manifest["layers"]) == 3
+
+
+@pytest.mark.parametrize(
+    "config, message",
+    [
+        (Config(output_format="docker"), "output format 'docker' is not valid"),
+        (Config(output_format="oci", image_cmd=["a.b"]), "please set image_base"),
+        (Config(output_format="oci", image_base="missing"), "has no index.json"),
+    ],
+)
+def test_build_lambda_checks_config_before_installing(config, message, caplog):
+    test_path = LambdaAutoPackage._create_tmp_directory()
+    test_path.joinpath("requirements.txt").write_text("not-a-package-anywhere")
+    test_path.joinpath("test_file_1.py").write_text("test file 1")
+
+    with caplog.at_level(logging.INFO), pytest.raises(
+        (ValueError, InvalidBaseImage), match=message
+    ):
+        LambdaAutoPackage(config=config, project_directory=test_path).execute()
+
+    assert "using requirements.txt" not in caplog.text
@@ -1,4 +1,5 @@
 import logging
+import os
 import unittest
 import shutil
 import zipfile
@@ -8,6 +9,11 @@ import pytest
 
 from lambda_packager.config import Config
 from lambda_packager.handle_requirements_txt import install_requirements_txt
+from lambda_packager.handle_wheel_store import (
+    _unpack_into_store,
+    install_from_wheel_store,
+    unpack_wheel,
+)
 from lambda_packager.package import LambdaAutoPackage, NoSrcFilesFound
 import test_file_helpers
 
@@ -316,3 +322,157 @@ def test_copy_source_files_follows_symlinks(caplog):
 
     assert not test_path.joinpath("simlink_file").is_symlink()
     assert not test_path.joinpath("real_file").exists()
+
+
+def test_requirements_txt_is_installed_from_wheel_store():
+    test_path = LambdaAutoPackage._create_tmp_directory()
+    requirements = test_file_helpers.with_requirements_file(test_path)
+    store = test_path.joinpath("store")
+    target_1 = test_path.joinpath("dist_1")
+    target_2 = test_path.joinpath("dist_2")
+
+    for target in [target_1, target_2]:
+        install_from_wheel_store(
+            requirements_file_path=requirements,
+            target=str(target),
+            store_directory=store,
+        )
+
+    installed_1 = target_1.joinpath("pip_install_test/__init__.py")
+    installed_2 = target_2.joinpath("pip_install_test/__init__.py")
+    assert installed_1.is_file()
+    assert installed_2.is_file()
+    assert installed_1.stat().st_ino == installed_2.stat().st_ino
+
+    unpacked = [path.name for path in store.joinpath("unpacked").iterdir()]
+    assert unpacked == ["pip_install_test-0.5-py3-none-any"]
+
+
+def test_unpack_wheel_uses_pip_target_layout():
+    test_path = LambdaAutoPackage._create_tmp_directory()
+    wheel = test_path.joinpath("example-1.0-py3-none-any.whl")
+    with zipfile.ZipFile(wheel, "w") as whl:
+        whl.writestr("example/__init__.py", "")
+        whl.writestr("example-1.0.dist-info/METADATA", "Name: example")
+        whl.writestr("example-1.0.data/purelib/example_extra.py", "")
+        whl.writestr("example-1.0.data/scripts/example-cli", "")
+        whl.writestr("example-1.0.data/headers/example.h", "")
+
+    target = test_path.joinpath("target")
+    unpack_wheel(wheel, target)
+
+    assert target.joinpath("example/__init__.py").is_file()
+    assert target.joinpath("example-1.0.dist-info/METADATA").is_file()
+    assert target.joinpath("example_extra.py").is_file()
+    assert target.joinpath("bin/example-cli").is_file()
+    assert not target.joinpath("example-1.0.data").exists()
+    assert not target.joinpath("example.h").exists()
+
+
+def test_unpack_wheel_rejects_unsafe_paths():
+    test_path = LambdaAutoPackage._create_tmp_directory()
+    wheel = test_path.joinpath("example-1.0-py3-none-any.whl")
+    with zipfile.ZipFile(wheel, "w") as whl:
+        whl.writestr("../escaped.py", "")
+
+    with pytest.raises(ValueError, match="refusing to unpack unsafe wheel entry*"):
+        unpack_wheel(wheel, test_path.joinpath("target"))
+
+
+def test_failed_unpack_leaves_nothing_in_store():
+    test_path = LambdaAutoPackage._create_tmp_directory()
+    wheel = test_path.joinpath("example-1.0-py3-none-any.whl")
+    with zipfile.ZipFile(wheel, "w") as whl:
+        whl.writestr("example/__init__.py", "")
+        whl.writestr("../escaped.py", "")
+    unpacked = test_path.joinpath("unpacked")
+    unpacked.mkdir()
+
+    with pytest.raises(ValueError, match="refusing to unpack unsafe wheel entry*"):
+        _unpack_into_store(wheel, unpacked)
+
+    assert list(unpacked.iterdir()) == []
+
+
+def test_copy_file_does_not_write_through_hard_links():
+    test_path = LambdaAutoPackage._create_tmp_directory()
+    stored = test_path.joinpath("stored.py")
+    stored.write_text("from the store")
+    staged = test_path.joinpath("staged.py")
+    os.link(stored, staged)
+    source = test_path.joinpath("source.py")
+    source.write_text("from the project")
+
+    package = LambdaAutoPackage(project_directory=test_path)
+    package.copy_file(source, staged, [])
+
+    assert staged.read_text() == "from the project"
+    assert stored.read_text() == "from the store"
+
+
+def test_build_lambda_keeps_file_modes_in_matched_directories():
+    test_path = LambdaAutoPackage._create_tmp_directory()
+    test_path.joinpath("handler.py").write_text("handler")
+    script = test_path.joinpath("tools/run.sh")
+    script.parent.mkdir()
+    script.write_text("#!/bin/sh")
+    script.chmod(0o755)
+
+    LambdaAutoPackage(
+        config=Config(src_patterns=["handler.py", "tools"]),
+        project_directory=test_path,
+    ).execute()
+
+    zip = zipfile.ZipFile(test_path.joinpath("dist/lambda.zip"))
+    assert zip.getinfo("tools/run.sh").external_attr >> 16 == 0o100755
+
+
+def test_build_lambda_stages_in_staging_directory():
+    test_path = LambdaAutoPackage._create_tmp_directory()
+    test_path.joinpath("handler.py").write_text("handler")
+    test_path.joinpath("build").mkdir()
+    test_path.joinpath("build/left_over.py").write_text("from a previous build")
+
+    package = LambdaAutoPackage(
+        config=Config(staging_directory="build"), project_directory=test_path
+    )
+    package.execute()
+
+    assert package.tmp_folder.parent == test_path.joinpath("build").resolve()
+    assert package.source_folder is None
+    zip = zipfile.ZipFile(test_path.joinpath("dist/lambda.zip"))
+    assert zip.namelist() == ["handler.py"]
+
+
+def test_source_walk_does_not_enter_staging_directory():
+    test_path = LambdaAutoPackage._create_tmp_directory()
+    test_path.joinpath("handler.py").write_text("handler")
+    test_path.joinpath("build/tmp_left_over").mkdir(parents=True)
+    test_path.joinpath("build/tmp_left_over/installed.py").write_text("installed")
+
+    package = LambdaAutoPackage(
+        config=Config(staging_directory="build", src_patterns=["*.py"]),
+        project_directory=test_path,
+    )
+    matches = package._matching_files_and_folders(test_path)
+
+    assert matches == {test_path.joinpath("handler.py")}
+
+
+def test_installer_is_ignored_with_a_wheel_store(caplog):
+    test_path = LambdaAutoPackage._create_tmp_directory()
+    test_file_helpers.with_requirements_file(test_path)
+    test_path.joinpath("handler.py").write_text("handler")
+
+    package = LambdaAutoPackage(
+        config=Config(wheel_store="store", installer="uv"),
+        project_directory=test_path,
+    )
+    package.execute()
+
+    assert (
+        "installer 'uv' is ignored as dependencies are installed from the wheel store"
+        in caplog.text
+    )
+    zip = zipfile.ZipFile(test_path.joinpath("dist/lambda.zip"))
+    assert "pip_install_test/__init__.py" in zip.namelist()
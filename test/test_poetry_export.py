@@ -89,3 +89,15 @@ def test_export_poetry_fails_if_no_exec_found():
         match=r"Please make sure you have poetry installed and in your path*",
     ):
         export_poetry(str(expected_path), env={})
+
+
+def test_poetry_is_used_with_parsed_config():
+    test_path = LambdaAutoPackage._create_tmp_directory()
+    config = {
+        "build-system": {
+            "requires": ["poetry-core>=1.0.0"],
+            "build-backend": "poetry.core.masonry.api",
+        }
+    }
+
+    assert poetry_is_used(current_directory=test_path, config=config)
@@ -0,0 +1,36 @@
+from pathlib import Path
+
+from lambda_packager.package import LambdaAutoPackage
+import test_file_helpers
+
+
+def config_of_project(config_file=None):
+    test_path = LambdaAutoPackage._create_tmp_directory()
+    if config_file:
+        test_file_helpers.with_config_file(test_path, config_file)
+    return LambdaAutoPackage(project_directory=test_path).config
+
+
+def test_read_config_of_project():
+    test_file = Path("test/resources/test_full_config.toml")
+    assert test_file.exists()
+
+    response = config_of_project(test_file)
+    assert response.src_patterns == ["lambda_packager", "test_file_*"]
+    assert not response.ignore_hidden_files
+    assert response.without_hashes
+
+
+def test_read_config_of_project_without_pyproject():
+    response = config_of_project()
+    assert response.src_patterns == ["*.py"]
+    assert response.ignore_hidden_files
+
+
+def test_read_config_of_project_without_config_section():
+    test_file = Path("test/resources/config_we_do_not_care_about.toml")
+    assert test_file.exists()
+
+    response = config_of_project(test_file)
+    assert response.src_patterns == ["*.py"]
+    assert response.ignore_hidden_files
@@ -0,0 +1,315 @@
+import logging
+import os
+import sys
+import zipfile
+
+import pytest
+
+from lambda_packager import remote_cache
+from lambda_packager.config import Config
+from lambda_packager.package import LambdaAutoPackage
+from lambda_packager.remote_cache import (
+    FileSystemCache,
+    RemoteCache,
+    S3Cache,
+    UncacheableRequirements,
+    artifact_key,
+    cache_from_url,
+    dependency_key,
+)
+import test_file_helpers
+
+
+class InMemoryS3Client:
+    """Local stand-in for the parts of a boto3 s3 client used by S3Cache"""
+
+    class exceptions:
+        class NoSuchKey(Exception):
+            pass
+
+    class Body:
+        def __init__(self, data):
+            self.data = data
+
+        def read(self):
+            return self.data
+
+    def __init__(self):
+        self.objects = {}
+
+    def get_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise self.exceptions.NoSuchKey(Key)
+        return {"Body": self.Body(self.objects[(Bucket, Key)])}
+
+    def put_object(self, Bucket, Key, Body):
+        self.objects[(Bucket, Key)] = Body
+
+
+def with_directory_to_cache():
+    directory = LambdaAutoPackage._create_tmp_directory()
+    directory.joinpath("package").mkdir()
+    directory.joinpath("package/__init__.py").write_text("init")
+    directory.joinpath("package/data.bin").write_bytes(os.urandom(100_000))
+    directory.joinpath("script").write_text("#!/bin/sh")
+    directory.joinpath("script").chmod(0o755)
+    return directory
+
+
+def assert_same_tree(expected, actual):
+    for path in expected.rglob("*"):
+        restored = actual.joinpath(path.relative_to(expected))
+        if path.is_file():
+            assert restored.read_bytes() == path.read_bytes()
+            assert restored.stat().st_mode & 0o111 == path.stat().st_mode & 0o111
+
+
+@pytest.mark.parametrize(
+    "backend",
+    [
+        lambda: FileSystemCache(LambdaAutoPackage._create_tmp_directory()),
+        lambda: S3Cache("bucket", "prefix", client=InMemoryS3Client()),
+    ],
+)
+def test_publish_and_restore_in_chunks(backend):
+    cache = RemoteCache(backend(), workers=3, blob_size=16 * 1024)
+    directory = with_directory_to_cache()
+
+    assert cache.publish("dependencies/key", directory)
+
+    restored = LambdaAutoPackage._create_tmp_directory()
+    assert cache.restore("dependencies/key", restored)
+    assert_same_tree(directory, restored)
+
+
+def test_restore_extracts_in_staging_directory(monkeypatch):
+    staging = LambdaAutoPackage._create_tmp_directory()
+    cache = RemoteCache(
+        FileSystemCache(LambdaAutoPackage._create_tmp_directory()),
+        staging_directory=staging,
+    )
+    cache.publish("dependencies/key", with_directory_to_cache())
+    extracted = []
+    link_tree = remote_cache.link_tree
+
+    def record_link_tree(source, target):
+        extracted.append(source)
+        link_tree(source, target)
+
+    monkeypatch.setattr(remote_cache, "link_tree", record_link_tree)
+    assert cache.restore("dependencies/key", LambdaAutoPackage._create_tmp_directory())
+
+    assert [path.parent for path in extracted] == [staging]
+    assert list(staging.iterdir()) == []
+
+
+def test_restore_missing_entry():
+    cache = RemoteCache(FileSystemCache(LambdaAutoPackage._create_tmp_directory()))
+    assert not cache.restore(
+        "dependencies/missing", LambdaAutoPackage._create_tmp_directory()
+    )
+
+
+def test_restore_corrupt_entry_leaves_directory_untouched():
+    cache_dir = LambdaAutoPackage._create_tmp_directory()
+    cache = RemoteCache(FileSystemCache(cache_dir), blob_size=16 * 1024)
+    cache.publish("dependencies/key", with_directory_to_cache())
+
+    blob = sorted(cache_dir.joinpath("blobs").iterdir())[-1]
+    blob.write_bytes(b"corrupt")
+
+    restored = LambdaAutoPackage._create_tmp_directory()
+    assert not cache.restore("dependencies/key", restored)
+    assert list(restored.iterdir()) == []
+
+
+def test_only_manifest_is_written_last():
+    client = InMemoryS3Client()
+    cache = RemoteCache(S3Cache("bucket", client=client), blob_size=16 * 1024)
+
+    cache.publish("dependencies/key", with_directory_to_cache())
+
+    keys = [key for _bucket, key in client.objects]
+    assert keys[-1] == "manifests/dependencies/key.json"
+    assert all(key.startswith("blobs/") for key in keys[:-1])
+
+
+def test_failed_put_leaves_no_partial_files():
+    cache_dir = LambdaAutoPackage._create_tmp_directory()
+    backend = FileSystemCache(cache_dir)
+
+    with pytest.raises(TypeError):
+        backend.put("blobs/abc", "not bytes")
+
+    assert list(cache_dir.joinpath("blobs").iterdir()) == []
+
+
+def test_cache_from_url_filesystem():
+    assert isinstance(cache_from_url("file:///tmp/cache"), FileSystemCache)
+    assert cache_from_url("/tmp/cache").directory.as_posix() == "/tmp/cache"
+
+
+def test_relative_remote_cache_is_resolved_from_project_directory(monkeypatch):
+    workspace = LambdaAutoPackage._create_tmp_directory()
+    project = workspace.joinpath("project")
+    project.mkdir()
+    project.joinpath("test_file_1.py").write_text("test file 1")
+    monkeypatch.chdir(LambdaAutoPackage._create_tmp_directory())
+
+    LambdaAutoPackage(
+        config=Config(remote_cache="../shared-cache"), project_directory=project
+    ).execute()
+
+    assert workspace.joinpath("shared-cache/manifests").is_dir()
+
+
+def test_keys_change_with_inputs():
+    test_path = LambdaAutoPackage._create_tmp_directory()
+    requirements = test_file_helpers.with_requirements_file(test_path)
+    source = LambdaAutoPackage._create_tmp_directory()
+    source.joinpath("handler.py").write_text("handler")
+
+    key = dependency_key(requirements)
+    assert key == dependency_key(requirements)
+    assert key != dependency_key(requirements, no_deps=True)
+
+    artifacts = artifact_key(key, {"src_patterns": ["*.py"]}, source)
+    assert artifacts != artifact_key(key, {"src_patterns": ["*"]}, source)
+    source.joinpath("handler.py").write_text("changed")
+    assert artifacts != artifact_key(key, {"src_patterns": ["*.py"]}, source)
+
+
+def test_dependency_key_changes_with_included_files():
+    test_path = LambdaAutoPackage._create_tmp_directory()
+    requirements = test_path.joinpath("requirements.txt")
+    requirements.write_text(
+        "-r base.txt\n--constraint=constraints/pins.txt  # pinned\n"
+    )
+    test_path.joinpath("base.txt").write_text("-rmore.txt\npip-install-test\n")
+    test_path.joinpath("more.txt").write_text("")
+    test_path.joinpath("constraints").mkdir()
+    test_path.joinpath("constraints/pins.txt").write_text("pip-install-test==0.5\n")
+
+    keys = {dependency_key(requirements)}
+    for included in ["base.txt", "more.txt", "constraints/pins.txt"]:
+        with test_path.joinpath(included).open("a") as f:
+            f.write("wheel\n")
+        keys.add(dependency_key(requirements))
+
+    assert len(keys) == 4
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        "-e .",
+        "./libs/package",
+        "package @ file:///libs/package",
+        "--find-links ./wheels",
+        "-f/wheels",
+    ],
+)
+def test_dependency_key_rejects_local_paths(line):
+    test_path = LambdaAutoPackage._create_tmp_directory()
+    requirements = test_path.joinpath("requirements.txt")
+    requirements.write_text(f"pip-install-test\n{line}\n")
+
+    with pytest.raises(UncacheableRequirements, match="points at a local path"):
+        dependency_key(requirements)
+
+
+def test_dependency_key_allows_remote_requirements():
+    test_path = LambdaAutoPackage._create_tmp_directory()
+    requirements = test_path.joinpath("requirements.txt")
+    requirements.write_text(
+        "package @ https://example.com/package-1.0-py3-none-any.whl\n"
+        "-e git+https://example.com/repo.git#egg=repo\n"
+        "--index-url https://example.com/simple\n"
+        "pip-install-test==0.5 ; python_version >= '3.8' \\\n"
+        "    --hash=sha256:00\n"
+    )
+
+    assert dependency_key(requirements)
+
+
+def test_build_lambda_does_not_cache_local_requirements(caplog):
+    cache_dir = LambdaAutoPackage._create_tmp_directory()
+    test_path = LambdaAutoPackage._create_tmp_directory()
+    test_path.joinpath("test_file_1.py").write_text("test file 1")
+    wheel = test_path.joinpath("local-1.0-py3-none-any.whl")
+    with zipfile.ZipFile(wheel, "w") as whl:
+        whl.writestr("local.py", "")
+        whl.writestr(
+            "local-1.0.dist-info/METADATA",
+            "Metadata-Version: 2.1\nName: local\nVersion: 1.0\n",
+        )
+        whl.writestr(
+            "local-1.0.dist-info/WHEEL",
+            "Wheel-Version: 1.0\nRoot-Is-Purelib: true\nTag: py3-none-any\n",
+        )
+        whl.writestr("local-1.0.dist-info/RECORD", "")
+    test_path.joinpath("requirements.txt").write_text(f"{wheel}\n")
+    config = Config(remote_cache=str(cache_dir), src_patterns=["test_file_*"])
+
+    with caplog.at_level(logging.WARNING):
+        LambdaAutoPackage(config=config, project_directory=test_path).execute()
+
+    assert f"building without caching dependencies as '{wheel}'" in caplog.text
+    assert list(cache_dir.iterdir()) == []
+    zip = zipfile.ZipFile(test_path.joinpath("dist/lambda.zip"))
+    assert "local.py" in zip.namelist()
+
+
+def test_build_lambda_restores_artifacts_from_remote_cache(caplog):
+    cache_dir = LambdaAutoPackage._create_tmp_directory()
+    config = Config(remote_cache=f"file://{cache_dir}")
+
+    first = LambdaAutoPackage._create_tmp_directory()
+    first.joinpath("test_file_1.py").write_text("test file 1")
+    LambdaAutoPackage(config=config, project_directory=first).execute()
+
+    second = LambdaAutoPackage._create_tmp_directory()
+    second.joinpath("test_file_1.py").write_text("test file 1")
+    with caplog.at_level(logging.INFO):
+        LambdaAutoPackage(config=config, project_directory=second).execute()
+
+    assert "restored 'artifacts/" in caplog.text
+    zip = zipfile.ZipFile(second.joinpath("dist/lambda.zip"))
+    assert ["test_file_1.py"] == zip.namelist()
+
+
+def test_build_lambda_restores_dependencies_from_remote_cache(caplog):
+    cache_dir = LambdaAutoPackage._create_tmp_directory()
+    config = Config(remote_cache=str(cache_dir), src_patterns=["test_file_*"])
+
+    first = LambdaAutoPackage._create_tmp_directory()
+    test_file_helpers.with_requirements_file(first)
+    first.joinpath("test_file_1").write_text("test file 1")
+    LambdaAutoPackage(config=config, project_directory=first).execute()
+
+    second = LambdaAutoPackage._create_tmp_directory()
+    test_file_helpers.with_requirements_file(second)
+    second.joinpath("test_file_2").write_text("test file 2")
+    with caplog.at_level(logging.INFO):
+        LambdaAutoPackage(config=config, project_directory=second).execute()
+
+    assert "restored 'dependencies/" in caplog.text
+    zip = zipfile.ZipFile(second.joinpath("dist/lambda.zip"))
+    assert "pip_install_test/__init__.py" in zip.namelist()
+    assert "test_file_2" in zip.namelist()
+    assert "test_file_1" not in zip.namelist()
+
+
+def test_build_lambda_without_boto3_builds_without_cache(monkeypatch, caplog):
+    # a None entry in sys.modules makes `import boto3` raise ImportError
+    monkeypatch.setitem(sys.modules, "boto3", None)
+    test_path = LambdaAutoPackage._create_tmp_directory()
+    test_path.joinpath("test_file_1.py").write_text("test file 1")
+    config = Config(remote_cache="s3://bucket/prefix")
+
+    with caplog.at_level(logging.WARNING):
+        LambdaAutoPackage(config=config, project_directory=test_path).execute()
+
+    assert "building without the remote cache as it is unavailable" in caplog.text
+    assert "boto3" in caplog.text
+    assert test_path.joinpath("dist/lambda.zip").is_file()
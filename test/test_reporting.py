@@ -0,0 +1,89 @@
+import io
+import json
+import logging
+import zipfile
+
+from lambda_packager.config import Config
+from lambda_packager.custom_log_formatter import CustomLogFormatter
+from lambda_packager.package import LambdaAutoPackage
+from lambda_packager.reporting import JsonLogFormatter, ProgressBar, Reporter
+
+
+def make_record(level=logging.INFO, msg="copied %s files", args=(3,)):
+    return logging.LogRecord("test", level, "path.py", 10, msg, args, None)
+
+
+def test_custom_log_formatter_reuses_formatters():
+    formatter = CustomLogFormatter()
+    info_formatter = formatter.formatters[logging.INFO]
+
+    output = formatter.format(make_record())
+    formatter.format(make_record())
+
+    assert "copied 3 files" in output
+    assert output.startswith(CustomLogFormatter.grey)
+    assert formatter.formatters[logging.INFO] is info_formatter
+    assert formatter.format(make_record(level=5)) == "copied 3 files"
+
+
+def test_json_log_formatter_writes_one_object_per_record():
+    output = JsonLogFormatter().format(make_record(level=logging.WARNING))
+
+    assert "\n" not in output
+    entry = json.loads(output)
+    assert entry["level"] == "WARNING"
+    assert entry["message"] == "copied 3 files"
+    assert entry["location"] == "path.py:10"
+
+
+def test_progress_bar_is_rate_limited():
+    stream = io.StringIO()
+    reporter = Reporter(progress_bar=ProgressBar(stream, interval=3600))
+
+    with reporter.stage("zip") as stage:
+        for _ in range(1000):
+            stage.add("files")
+
+    assert stream.getvalue().count("\r\x1b[Kzip: ") == 1
+    assert stream.getvalue().endswith("\r\x1b[K")
+    assert reporter.stages[0].counts["files"] == 1000
+
+
+def test_no_progress_bar_when_not_a_terminal():
+    reporter = Reporter.for_stream(logging.getLogger(), io.StringIO())
+    assert reporter.progress_bar is None
+
+
+def test_copy_source_files_logs_a_summary(caplog):
+    test_path = LambdaAutoPackage._create_tmp_directory()
+    source_dir = LambdaAutoPackage._create_tmp_directory()
+    source_dir.joinpath("test_file_1").write_text("test file 1")
+    source_dir.joinpath(".dotfolder").mkdir()
+    source_dir.joinpath(".dotfolder/test_file_2").write_text("test file 2")
+
+    reporter = Reporter()
+    package = LambdaAutoPackage(config=Config(src_patterns=["*"]), reporter=reporter)
+    with caplog.at_level(logging.INFO):
+        package._copy_source_files(source_dir=source_dir, target_dir=test_path)
+
+    stage = reporter.stages[0]
+    assert stage.counts["files"] == 1
+    assert stage.counts["skipped"] == 2
+    assert "copy source files: 1 files, 2 skipped in" in caplog.text
+    assert "copied the following locations" not in caplog.text
+    assert "skipping path" not in caplog.text
+
+
+def test_build_lambda_reports_zip_stage():
+    test_path = LambdaAutoPackage._create_tmp_directory()
+    test_path.joinpath("test_file_1.py").write_text("test file 1")
+
+    reporter = Reporter()
+    LambdaAutoPackage(project_directory=test_path, reporter=reporter).execute()
+
+    zip_stage = reporter.stages[-1]
+    assert zip_stage.name == "write zip output"
+    assert zip_stage.counts["files"] == 1
+    assert zip_stage.counts["bytes"] == len("test file 1")
+    zip = zipfile.ZipFile(test_path.joinpath("dist/lambda.zip"))
+    assert zip.namelist() == ["test_file_1.py"]
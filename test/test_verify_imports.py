@@ -0,0 +1,116 @@
+import json
+import sysconfig
+
+import pytest
+
+from lambda_packager.config import Config
+from lambda_packager.package import LambdaAutoPackage
+from lambda_packager.verify_imports import (
+    ImportVerificationFailed,
+    find_top_level_modules,
+    import_module,
+    verify_imports,
+)
+
+
+def test_find_top_level_modules():
+    staging_dir = LambdaAutoPackage._create_tmp_directory()
+    staging_dir.joinpath("handler.py").write_text("")
+    staging_dir.joinpath("package").mkdir()
+    staging_dir.joinpath("package/__init__.py").write_text("")
+    staging_dir.joinpath("package-1.0.dist-info").mkdir()
+    staging_dir.joinpath("bin").mkdir()
+    staging_dir.joinpath("__pycache__").mkdir()
+    staging_dir.joinpath("requirements.txt").write_text("")
+    staging_dir.joinpath("not-a-module.py").write_text("")
+    extension = "native" + sysconfig.get_config_var("EXT_SUFFIX")
+    staging_dir.joinpath(extension).write_text("")
+
+    assert find_top_level_modules(staging_dir) == ["handler", "native", "package"]
+
+
+def test_import_module_does_not_use_the_interpreters_site_packages():
+    staging_dir = LambdaAutoPackage._create_tmp_directory()
+    staging_dir.joinpath("handler.py").write_text("import pytest")
+
+    result = import_module(staging_dir, "handler", timeout=30)
+
+    assert result.error == "ModuleNotFoundError: No module named 'pytest'"
+
+
+def test_import_module_records_time_and_ignores_module_output():
+    staging_dir = LambdaAutoPackage._create_tmp_directory()
+    staging_dir.joinpath("noisy.py").write_text("print('hello')")
+
+    result = import_module(staging_dir, "noisy", timeout=30)
+
+    assert result.error is None
+    assert result.seconds >= 0
+
+
+def test_import_module_with_output_without_newline_or_at_exit():
+    staging_dir = LambdaAutoPackage._create_tmp_directory()
+    staging_dir.joinpath("partial.py").write_text(
+        "import sys\nsys.stdout.write('loading')"
+    )
+    staging_dir.joinpath("at_exit.py").write_text(
+        "import atexit\natexit.register(print, 'bye')"
+    )
+    staging_dir.joinpath("exits.py").write_text("import os\nos._exit(0)")
+
+    partial = import_module(staging_dir, "partial", timeout=30)
+    at_exit = import_module(staging_dir, "at_exit", timeout=30)
+    exits = import_module(staging_dir, "exits", timeout=30)
+
+    assert partial.error is None and partial.seconds >= 0
+    assert at_exit.error is None and at_exit.seconds >= 0
+    assert exits.error == "the import did not finish"
+
+
+def test_import_module_reports_errors_and_timeouts():
+    staging_dir = LambdaAutoPackage._create_tmp_directory()
+    staging_dir.joinpath("broken.py").write_text("import not_installed_anywhere")
+    staging_dir.joinpath("slow.py").write_text("import time\ntime.sleep(10)")
+
+    broken = import_module(staging_dir, "broken", timeout=30)
+    slow = import_module(staging_dir, "slow", timeout=0.5)
+
+    assert "ModuleNotFoundError" in broken.error
+    assert slow.error == "timed out after 0.5s"
+
+
+def test_verify_imports_writes_report_and_fails_on_broken_modules():
+    staging_dir = LambdaAutoPackage._create_tmp_directory()
+    staging_dir.joinpath("good.py").write_text("")
+    staging_dir.joinpath("broken.py").write_text("raise ImportError('bad abi')")
+    report = LambdaAutoPackage._create_tmp_directory().joinpath("report.json")
+
+    with pytest.raises(ImportVerificationFailed, match="broken: ImportError: bad abi"):
+        verify_imports(staging_dir, report, workers=2)
+
+    contents = json.loads(report.read_text())
+    assert [result["module"] for result in contents["imports"]] == ["good"]
+    assert [result["module"] for result in contents["failed"]] == ["broken"]
+
+
+def test_verify_imports_can_ignore_modules():
+    staging_dir = LambdaAutoPackage._create_tmp_directory()
+    staging_dir.joinpath("good.py").write_text("")
+    staging_dir.joinpath("broken.py").write_text("raise ImportError('bad abi')")
+    report = LambdaAutoPackage._create_tmp_directory().joinpath("report.json")
+
+    results = verify_imports(staging_dir, report, ignore=["broken"])
+
+    assert [result.module for result in results] == ["good"]
+
+
+def test_build_lambda_verifies_imports():
+    test_path = LambdaAutoPackage._create_tmp_directory()
+    test_path.joinpath("test_file_1.py").write_text("VALUE = 1")
+
+    LambdaAutoPackage(
+        config=Config(verify_imports=True), project_directory=test_path
+    ).execute()
+
+    report = json.loads(test_path.joinpath("dist/import-report.json").read_text())
+    assert [result["module"] for result in report["imports"]] == ["test_file_1"]